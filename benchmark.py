@@ -0,0 +1,551 @@
+"""
+End-to-end throughput benchmark for main.py against a mock Plex server.
+
+A synthetic Plex server is started on localhost, serving movie, show and music sections generated on the fly
+(library/sections, paged /all listings, /library/metadata, /children, /allLeaves and artwork) with optional latency.
+main.py is then run against a temporary media folder and items/sec, requests issued, bytes written and peak RSS are reported.
+
+    python benchmark.py --preset small
+    python benchmark.py --movies 5000 --latency 0.02 --runs 2 --set "Workers=8" -- --parallel-libraries 2
+    python benchmark.py --mock-only --workdir /tmp/mock    # then run main.py --watch from /tmp/mock
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from PIL import Image
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import quoteattr
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import psutil
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import yaml
+
+PRESETS = {
+    'small': {'movies': 1000, 'shows': 50, 'seasons': 2, 'episodes': 10, 'artists': 50, 'albums': 2, 'tracks': 10},
+    'medium': {'movies': 10000, 'shows': 500, 'seasons': 3, 'episodes': 10, 'artists': 500, 'albums': 3, 'tracks': 10},
+    'large': {'movies': 100000, 'shows': 2000, 'seasons': 5, 'episodes': 12, 'artists': 2000, 'albums': 5, 'tracks': 12},
+}
+
+PLEX_ROOT = '/plex'
+UPDATED_AT = 1700000000
+# ratingKey = kind * KEY_SPACE + index, so any item can be rebuilt from its key without keeping the library in memory
+KEY_SPACE = 10 ** 12
+MOVIE, SHOW, SEASON, EPISODE, ARTIST, ALBUM, TRACK = range(1, 8)
+SECTIONS = {
+    '1': ('movie', 'Movies'),
+    '2': ('show', 'TV Shows'),
+    '3': ('artist', 'Music'),
+}
+# kind -> (plex item type, section) of the timeline notification reporting a change to it
+TIMELINE_TYPES = {MOVIE: (1, '1'), SHOW: (2, '2'), SEASON: (3, '2'), EPISODE: (4, '2'), ARTIST: (8, '3'), ALBUM: (9, '3'), TRACK: (10, '3')}
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def make_image(image_format, mode, color):
+    buffer = BytesIO()
+    Image.new(mode, (600, 900), color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class MockPlex:
+    """
+    Synthetic library, every listing and item is rendered from counts and ratingKeys on request
+    """
+    def __init__(self, counts, latency=0.0):
+        self.counts = counts
+        self.latency = latency
+        self.poster = make_image('JPEG', 'RGB', (180, 30, 30))
+        self.fanart = make_image('PNG', 'RGBA', (30, 30, 180, 255))
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def count_request(self, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    @staticmethod
+    def key(kind, index):
+        return str(kind * KEY_SPACE + index)
+
+    @staticmethod
+    def split_key(rating_key):
+        kind, index = divmod(int(rating_key), KEY_SPACE)
+        return kind, index
+
+    def item_count(self, kind):
+        counts = self.counts
+        return {
+            MOVIE: counts['movies'],
+            SHOW: counts['shows'],
+            SEASON: counts['shows'] * counts['seasons'],
+            EPISODE: counts['shows'] * counts['seasons'] * counts['episodes'],
+            ARTIST: counts['artists'],
+            ALBUM: counts['artists'] * counts['albums'],
+            TRACK: counts['artists'] * counts['albums'] * counts['tracks'],
+        }[kind]
+
+    def exists(self, rating_key):
+        try:
+            kind, index = self.split_key(rating_key)
+        except ValueError:
+            return False
+        return MOVIE <= kind <= TRACK and index < self.item_count(kind)
+
+    def notify(self, rating_key):
+        """
+        Push the timeline notification plex sends once an item finished updating to every open websocket
+        """
+        item_type, section = TIMELINE_TYPES[self.split_key(rating_key)[0]]
+        entry = {'identifier': 'com.plexapp.plugins.library', 'sectionID': section, 'itemID': int(rating_key), 'type': item_type, 'state': 5}
+        message = json.dumps({'NotificationContainer': {'type': 'timeline', 'size': 1, 'TimelineEntry': [entry]}})
+        with self.lock:
+            for listener in self.listeners:
+                listener.put(message)
+        return len(self.listeners)
+
+    def children(self, rating_key):
+        """
+        (kind, first index, count) of an item's children, seasons/episodes are numbered per show and tracks per album
+        """
+        kind, index = self.split_key(rating_key)
+        counts = self.counts
+        if kind == SHOW:
+            return SEASON, index * counts['seasons'], counts['seasons']
+        if kind == SEASON:
+            return EPISODE, index * counts['episodes'], counts['episodes']
+        if kind == ARTIST:
+            return ALBUM, index * counts['albums'], counts['albums']
+        if kind == ALBUM:
+            return TRACK, index * counts['tracks'], counts['tracks']
+        return None, 0, 0
+
+    def folders(self):
+        """
+        Every media folder relative to the plex root, the benchmark creates them before running the exporter
+        """
+        counts = self.counts
+        for movie in range(counts['movies']):
+            yield f'movies/Movie {movie:06}'
+        for show in range(counts['shows']):
+            for season in range(counts['seasons']):
+                yield f'tv/Show {show:05}/Season {season + 1}'
+        for artist in range(counts['artists']):
+            for album in range(counts['albums']):
+                yield f'music/Artist {artist:05}/Album {album + 1}'
+
+    def element(self, rating_key, full):
+        kind, index = self.split_key(rating_key)
+        counts = self.counts
+        art = f' thumb="/library/metadata/{rating_key}/thumb/{UPDATED_AT}" art="/library/metadata/{rating_key}/art/{UPDATED_AT}"'
+        common = f'ratingKey="{rating_key}" key="/library/metadata/{rating_key}" updatedAt="{UPDATED_AT}" addedAt="{UPDATED_AT}"'
+
+        if kind == MOVIE:
+            title = f'Movie {index:06}'
+            part = f'<Media><Part file={quoteattr(f"{PLEX_ROOT}/movies/{title}/{title}.mkv")}/></Media>'
+            tags = ''
+            if full:
+                tags = (
+                    f'<Genre tag="Drama"/><Genre tag="Thriller"/><Country tag="United States"/><Guid id="imdb://tt{index:07}"/>'
+                    f'<Guid id="tmdb://{index}"/><Director tag="Director {index % 97}"/><Writer tag="Writer {index % 89}"/>'
+                    f'<Role tag="Actor {index % 83}" role="Lead"/><Role tag="Actor {index % 79}" role="Support"/>'
+                    f'<Rating type="audience" value="7.{index % 10}"/>'
+                )
+            return (
+                f'<Video {common} type="movie" title="{title}" year="{1950 + index % 70}" guid="plex://movie/{rating_key}" '
+                f'librarySectionID="1" studio="Studio {index % 13}" contentRating="PG-13" rating="7.{index % 10}" duration="6000000" '
+                f'originallyAvailableAt="2000-01-01" tagline="Tagline {index}" summary="Synthetic movie number {index} &amp; friends."{art}>'
+                f'{part}{tags}</Video>'
+            )
+
+        if kind == SHOW:
+            title = f'Show {index:05}'
+            location = f'<Location path={quoteattr(f"{PLEX_ROOT}/tv/{title}")}/><Genre tag="Drama"/>' if full else ''
+            return (
+                f'<Directory {common} type="show" title="{title}" guid="plex://show/{rating_key}" librarySectionID="2" '
+                f'leafCount="{counts["seasons"] * counts["episodes"]}" summary="Synthetic show {index}."{art}>{location}</Directory>'
+            )
+
+        if kind == SEASON:
+            show, season = divmod(index, counts['seasons'])
+            return (
+                f'<Directory {common} type="season" title="Season {season + 1}" index="{season + 1}" librarySectionID="2" '
+                f'parentRatingKey="{self.key(SHOW, show)}" thumb="/library/metadata/{rating_key}/thumb/{UPDATED_AT}"></Directory>'
+            )
+
+        if kind == EPISODE:
+            season_index, episode = divmod(index, counts['episodes'])
+            show, season = divmod(season_index, counts['seasons'])
+            path = f'{PLEX_ROOT}/tv/Show {show:05}/Season {season + 1}/S{season + 1:02}E{episode + 1:02}.mkv'
+            return (
+                f'<Video {common} type="episode" title="Episode {episode + 1}" index="{episode + 1}" parentIndex="{season + 1}" '
+                f'librarySectionID="2" parentRatingKey="{self.key(SEASON, season_index)}" grandparentRatingKey="{self.key(SHOW, show)}" '
+                f'contentRating="TV-14" rating="8.0" originallyAvailableAt="2010-01-01" summary="Episode {episode + 1}.">'
+                f'<Media><Part file={quoteattr(path)}/></Media><Guid id="tvdb://{index}"/></Video>'
+            )
+
+        if kind == ARTIST:
+            title = f'Artist {index:05}'
+            location = f'<Location path={quoteattr(f"{PLEX_ROOT}/music/{title}")}/><Genre tag="Rock"/>' if full else ''
+            return f'<Directory {common} type="artist" title="{title}" librarySectionID="3"{art}>{location}</Directory>'
+
+        if kind == ALBUM:
+            artist, album = divmod(index, counts['albums'])
+            return (
+                f'<Directory {common} type="album" title="Album {album + 1}" librarySectionID="3" year="2001" '
+                f'parentRatingKey="{self.key(ARTIST, artist)}" thumb="/library/metadata/{rating_key}/thumb/{UPDATED_AT}"></Directory>'
+            )
+
+        album_index, track = divmod(index, counts['tracks'])
+        artist, album = divmod(album_index, counts['albums'])
+        path = f'{PLEX_ROOT}/music/Artist {artist:05}/Album {album + 1}/{track + 1:02}.flac'
+        return (
+            f'<Track {common} type="track" title="Track {track + 1}" index="{track + 1}" librarySectionID="3" '
+            f'parentRatingKey="{self.key(ALBUM, album_index)}" grandparentRatingKey="{self.key(ARTIST, artist)}">'
+            f'<Media><Part file={quoteattr(path)}/></Media></Track>'
+        )
+
+    def container(self, kind, first, count, query, headers, full):
+        """
+        One page of a listing, honouring X-Plex-Container-Start/Size from the query or headers and updatedAt>= filters
+        """
+        def option(name, default):
+            return int((query.get(name) or [headers.get(name) or default])[0])
+
+        for name, values in query.items():
+            if name.startswith('updatedAt>') and int(values[0]) > UPDATED_AT:
+                count = 0
+
+        start = option('X-Plex-Container-Start', 0)
+        size = option('X-Plex-Container-Size', count)
+        page = range(first + start, first + min(count, start + size))
+        items = ''.join(self.element(self.key(kind, index), full) for index in page)
+        return f'<MediaContainer size="{len(page)}" totalSize="{count}" offset="{start}">{items}</MediaContainer>'
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # main.py exiting resets its idle keep-alive connections, that is not an error of the mock
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_handler(plex):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body are separate writes, with Nagle on every keep-alive request would wait out the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def send(self, body, content_type='text/xml', status=200, extra_headers=None):
+            if isinstance(body, str):
+                body = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            plex.count_request(len(body))
+
+        def send_image(self, body, content_type):
+            etag = f'"{len(body)}-{UPDATED_AT}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self.send(b'', content_type, 304, {'ETag': etag})
+            return self.send(body, content_type, 200, {'ETag': etag})
+
+        def stream_notifications(self):
+            """
+            Minimal websocket server side: accept the upgrade, then send queued notifications as text frames and a ping when idle
+            """
+            accept = base64.b64encode(hashlib.sha1((self.headers.get('Sec-WebSocket-Key', '') + WEBSOCKET_GUID).encode()).digest()).decode()
+            self.send_response(101)
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept)
+            self.end_headers()
+            self.wfile.flush()
+
+            listener = queue.Queue()
+            with plex.lock:
+                plex.listeners.append(listener)
+            try:
+                while True:
+                    try:
+                        message = listener.get(timeout=5).encode()
+                    except queue.Empty:
+                        self.wfile.write(b'\x89\x00')
+                    else:
+                        length = len(message)
+                        if length < 126:
+                            header = bytes([0x81, length])
+                        elif length < 65536:
+                            header = bytes([0x81, 126]) + length.to_bytes(2, 'big')
+                        else:
+                            header = bytes([0x81, 127]) + length.to_bytes(8, 'big')
+                        self.wfile.write(header + message)
+                    self.wfile.flush()
+            except OSError:
+                pass
+            finally:
+                with plex.lock:
+                    plex.listeners.remove(listener)
+                self.close_connection = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = unquote(url.path)
+            query = parse_qs(url.query)
+            parts = path.strip('/').split('/')
+
+            if path == '/:/websockets/notifications':
+                return self.stream_notifications()
+
+            # not a plex endpoint, GET /notify/<ratingKey> reports the item as changed to every --watch listener
+            if parts[0] == 'notify' and len(parts) == 2 and plex.exists(parts[1]):
+                return self.send(f'{plex.notify(parts[1])} listener(s) notified', 'text/plain')
+
+            if plex.latency:
+                time.sleep(plex.latency)
+
+            if path == '/library/sections':
+                directories = ''.join(f'<Directory key="{key}" type="{kind}" title="{title}"/>' for key, (kind, title) in SECTIONS.items())
+                return self.send(f'<MediaContainer size="{len(SECTIONS)}">{directories}</MediaContainer>')
+
+            if parts[:2] == ['library', 'sections'] and len(parts) == 4 and parts[2] in SECTIONS:
+                section, listing = parts[2], parts[3]
+                item_type = (query.get('type') or [''])[0]
+                if section == '1':
+                    kind = MOVIE
+                elif section == '2':
+                    kind = EPISODE if item_type == '4' else SHOW
+                elif listing == 'albums' or item_type == '9':
+                    kind = ALBUM
+                else:
+                    kind = TRACK if item_type == '10' else ARTIST
+                return self.send(plex.container(kind, 0, plex.item_count(kind), query, self.headers, full=kind in (MOVIE, EPISODE, TRACK)))
+
+            if path == '/photo/:/transcode':
+                return self.send_image(plex.poster, 'image/jpeg')
+
+            if parts[:2] == ['library', 'metadata'] and len(parts) >= 3:
+                keys = [key for key in parts[2].split(',') if plex.exists(key)]
+                if not keys:
+                    return self.send('<MediaContainer size="0"/>', status=404)
+
+                if len(parts) == 3:
+                    items = ''.join(plex.element(key, full=True) for key in keys)
+                    return self.send(f'<MediaContainer size="{len(keys)}">{items}</MediaContainer>')
+
+                if parts[3] == 'children':
+                    kind, first, count = plex.children(keys[0])
+                    if kind is None:
+                        return self.send('<MediaContainer size="0"/>')
+                    return self.send(plex.container(kind, first, count, query, self.headers, full=True))
+
+                if parts[3] == 'allLeaves':
+                    kind, index = plex.split_key(keys[0])
+                    if kind != SHOW:
+                        return self.send('<MediaContainer size="0"/>')
+                    per_show = plex.counts['seasons'] * plex.counts['episodes']
+                    return self.send(plex.container(EPISODE, index * per_show, per_show, query, self.headers, full=True))
+
+                if parts[3] == 'thumb':
+                    return self.send_image(plex.poster, 'image/jpeg')
+                if parts[3] == 'art':
+                    return self.send_image(plex.fanart, 'image/png')
+
+            self.send('Not Found', 'text/plain', 404)
+
+    return Handler
+
+
+def write_config(workdir, media_dir, url, overrides):
+    config = {
+        'Base URL': url,
+        'Token': 'benchmark',
+        'Libraries': [title for _, title in SECTIONS.values()],
+        'Blacklist': [],
+        'Path mapping': [{'plex': PLEX_ROOT, 'local': media_dir}],
+        'Export NFO': True,
+        'Export poster': True,
+        'Export fanart': True,
+        'Export season poster': True,
+        'Export episode NFO': True,
+        'title': True,
+        'agent_id': True,
+        'tagline': True,
+        'plot': True,
+        'year': True,
+        'genre': True,
+        'ratings': True,
+        'roles': True,
+        'directors': True,
+        'writers': True,
+    }
+    config.update(overrides)
+    with open(os.path.join(workdir, 'config.yml'), 'w', encoding='utf-8') as handle:
+        yaml.safe_dump(config, handle, sort_keys=False)
+    with open(os.path.join(workdir, '.env'), 'w', encoding='utf-8') as handle:
+        handle.write(f"PLEX_URL='{url}'\nPLEX_TOKEN='benchmark'\n")
+
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        key, separator, raw = value.partition('=')
+        if not separator:
+            raise SystemExit(f'--set expects KEY=VALUE, got "{value}"')
+        overrides[key.strip()] = yaml.safe_load(raw)
+    return overrides
+
+
+def written_files(media_dir, since):
+    count = 0
+    size = 0
+    for root, _, files in os.walk(media_dir):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            if stat.st_mtime >= since:
+                count += 1
+                size += stat.st_size
+    return count, size
+
+
+def run_exporter(main_path, workdir, main_args, url):
+    """
+    Run main.py once, sampling the resident memory of it and its children (the image pool) every 50ms,
+    returns (seconds, peak rss bytes, exit code)
+    """
+    env = dict(os.environ, PLEX_URL=url, PLEX_TOKEN='benchmark', LOG_LEVEL='INFO')
+    started = time.perf_counter()
+    with open(os.path.join(workdir, 'exporter.out'), 'ab') as output:
+        process = subprocess.Popen([sys.executable, main_path, *main_args], cwd=workdir, env=env, stdout=output, stderr=subprocess.STDOUT)
+        watched = psutil.Process(process.pid)
+        peak_rss = 0
+        while process.poll() is None:
+            try:
+                processes = [watched, *watched.children(recursive=True)]
+            except psutil.Error:
+                processes = []
+            rss = 0
+            for sampled in processes:
+                try:
+                    rss += sampled.memory_info().rss
+                except psutil.Error:
+                    pass
+            peak_rss = max(peak_rss, rss)
+            time.sleep(0.05)
+
+    return time.perf_counter() - started, peak_rss, process.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark main.py end to end against a mock plex server.', epilog='Arguments after -- are passed to main.py.')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small', help='Library size to generate, individual counts below override it')
+    for name in PRESETS['small']:
+        parser.add_argument(f'--{name}', type=int, default=None, help=f'Number of {name}' + ('' if name in ('movies', 'shows', 'artists') else ' per parent'))
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the mock server waits before answering each request')
+    parser.add_argument('--runs', type=int, default=1, help='Consecutive runs against the same folder, later runs measure the up-to-date path')
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE', help='Override a config.yml key for the exporter, i.e. --set "Workers=8"')
+    parser.add_argument('--workdir', help='Folder for config, logs and media, a temporary one is used and removed otherwise')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file as JSON')
+    parser.add_argument('--port', type=int, default=0, help='Port of the mock server, a free one is picked by default')
+    parser.add_argument('--mock-only', action='store_true', help='Only run the mock server and its config until interrupted, i.e. to try main.py --watch against it')
+    args, main_args = parser.parse_known_args()
+    main_args = [arg for arg in main_args if arg != '--']
+
+    counts = dict(PRESETS[args.preset])
+    counts.update({name: getattr(args, name) for name in counts if getattr(args, name) is not None})
+    plex = MockPlex(counts, args.latency)
+
+    server = MockServer(('127.0.0.1', args.port), make_handler(plex))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='plex_nfo_benchmark_')
+    media_dir = os.path.join(workdir, 'media')
+    for folder in plex.folders():
+        os.makedirs(os.path.join(media_dir, folder), exist_ok=True)
+    write_config(workdir, media_dir, url, parse_overrides(args.set))
+
+    items = sum(plex.item_count(kind) for kind in (MOVIE, SHOW, ARTIST, ALBUM))
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    print(f"Mock plex at {url}: {counts['movies']} movies, {counts['shows']} shows ({plex.item_count(EPISODE)} episodes), "
+          f"{counts['artists']} artists ({plex.item_count(ALBUM)} albums), {args.latency * 1000:.0f}ms latency")
+    print(f'Working in {workdir}\n')
+
+    if args.mock_only:
+        print(f'Run main.py from the working folder, GET {url}/notify/<ratingKey> reports an item as changed to --watch')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        return 0
+
+    print(f"{'run':>3} {'seconds':>9} {'items/s':>9} {'requests':>9} {'MB served':>10} {'files':>8} {'MB written':>11} {'peak RSS MB':>12}")
+
+    results = []
+    try:
+        for run in range(1, args.runs + 1):
+            plex.reset_stats()
+            started = time.time()
+            seconds, peak_rss, exit_code = run_exporter(main_path, workdir, main_args, url)
+            files, size = written_files(media_dir, started)
+            result = {
+                'run': run,
+                'seconds': round(seconds, 3),
+                'items': items,
+                'items_per_second': round(items / seconds, 1) if seconds else None,
+                'requests': plex.requests,
+                'bytes_served': plex.bytes_sent,
+                'files_written': files,
+                'bytes_written': size,
+                'peak_rss_bytes': peak_rss,
+                'exit_code': exit_code,
+            }
+            results.append(result)
+            print(f"{run:>3} {seconds:>9.2f} {result['items_per_second']:>9} {plex.requests:>9} {plex.bytes_sent / 2 ** 20:>10.1f} "
+                  f"{files:>8} {size / 2 ** 20:>11.1f} {peak_rss / 2 ** 20:>12.1f}")
+            if exit_code:
+                print(f"main.py exited with {exit_code}, see {os.path.join(workdir, 'exporter.out')}")
+                break
+    finally:
+        server.shutdown()
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as handle:
+                json.dump({'counts': counts, 'latency': args.latency, 'main_args': main_args, 'results': results}, handle, indent=2)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return 1 if any(result['exit_code'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,15 @@
 
 cd /app || exit 1
 
+DAEMON_ARGS=""
+[ "$WATCH" = "true" ] && DAEMON_ARGS="$DAEMON_ARGS --watch"
+[ "$SERVE" = "true" ] && DAEMON_ARGS="$DAEMON_ARGS --serve"
+
+if [ -n "$DAEMON_ARGS" ]; then
+    echo "Running in daemon mode:$DAEMON_ARGS"
+    exec python /app/main.py $DAEMON_ARGS
+fi
+
 CRON_SCHEDULE="${CRON_SCHEDULE:-0 4 * * *}"
 
 echo "Using CRON_SCHEDULE: $CRON_SCHEDULE"
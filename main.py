@@ -1,24 +1,42 @@
 #!/usr/bin/env python3
 
 from alive_progress import alive_bar
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 from dotenv import load_dotenv
-from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
 from pathlib import Path
 from PIL import Image
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urljoin
 from textwrap import dedent
+from urllib3.util.retry import Retry
 
 import argparse
-import gzip
+import email
+import hashlib
+import itertools
+import json
 import logging
+import math
+import multiprocessing
 import os
 import re
 import requests
+import sqlite3
 import sys
+import threading
+import time
 import xml.etree.ElementTree as ET
 import yaml
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 if os.path.isdir('/app/config'):
     config_path = '/app/config/config.yml'
 else:
@@ -29,6 +47,61 @@ TYPE_MAP = {
     'show': ('tvshow', 'Directory'),
 }
 
+# plex keeps music under two roots, artists are listed from /all and albums from /albums
+MUSIC_PASSES = [
+    ('artist', 'Directory', 'all'),
+    ('albums', 'Directory', 'albums'),
+]
+
+summary_lock = threading.Lock()
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+FAILED_STATUSES = ('not_exist', 'failure')
+UNCHANGED = 'unchanged'
+# JPEG SOI marker followed by the first marker prefix, plex serves posters and art as JPEG in most cases
+JPEG_MAGIC = b'\xff\xd8\xff'
+IMAGE_CHUNK_SIZE = 64 * 1024
+PHOTO_TRANSCODE_UNBOUNDED = 10000
+# linux ioctl that shares a file's extents with another on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+DUPLICATE_MODES = ('copy', 'hardlink', 'reflink')
+# incremental listings reach this far before the last sync to cover clock drift between plex and this script
+SYNC_OVERLAP_SECONDS = 300
+
+session = requests.Session()
+http_timeout = 30
+page_size = 500
+# set by --watch/--serve, errors are raised to the daemon loop instead of ending the process
+daemon_mode = False
+
+# adaptive (AIMD) cap on requests in flight to plex, limit grows by one per healthy window and halves when plex slows down or errors
+limiter = {'enabled': False, 'limit': 1, 'ceiling': 1, 'in_flight': 0, 'latency_target': 1.0, 'interval': 0.0, 'next_slot': 0.0, 'samples': [], 'errors': 0, 'backoffs': 0}
+limiter_condition = threading.Condition()
+
+# plex responses already fetched this run, (url, query) -> response, least recently used first
+response_cache = OrderedDict()
+response_cache_limit = 0
+response_cache_bytes = 0
+response_cache_stats = {'hits': 0, 'misses': 0}
+response_cache_lock = threading.Lock()
+
+state_db = None
+state_lock = threading.Lock()
+
+image_pool = None
+image_pool_size = 0
+image_pool_lock = threading.Lock()
+# (max width, max height) per artwork kind, 0 keeps the original dimension
+image_sizes = {'poster': (0, 0), 'fanart': (0, 0)}
+image_quality = 0
+duplicate_mode = 'copy'
+
+render_plan = None
+
+# directory -> {name: os.DirEntry or mtime of a file written this run}, None for a missing directory
+dir_cache = {}
+dir_cache_lock = threading.Lock()
+
 class StoreTrueIfFlagPresent(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         setattr(namespace, self.dest, True)
@@ -110,14 +183,73 @@ CONFIG_PLACEHOLDER = dedent("""
     Token: ${PLEX_TOKEN} # how to get token https://support.plex.tv/articles/204059436-finding-an-authentication-token-x-plex-token/ or fill them in .env file and let this part be
 
     # input the libraries you want to export NFO/poster/fanart from
-    # if the library type is music, input it TWICE CONSECUTIVELY. This is due to plex having 2 different roots for music library, each for artist and albums
     # You can do all libraries using Libraries: ['*']
-    Libraries: ['Movies', 'TV Shows', 'Anime', 'Music', 'Music']
+    Libraries: ['Movies', 'TV Shows', 'Anime', 'Music']
     Blacklist: ['Test Movies']
 
     # overwrite files without checking if they are up-to-date with server's metadata
     Force overwrite: false
 
+    # skip items whose plex updatedAt hasn't changed since they were last exported, without requesting metadata or checking files
+    # shows also compare their episodes and seasons when episode NFOs or season posters are exported
+    # export history is kept in state.db next to this file, --full checks every item's files again (i.e. to restore deleted ones), Force overwrite ignores it
+    Skip unchanged items: true
+
+    # only ask plex for items updated since the last successful run of each library, use --full to list everything again
+    Incremental sync: false
+
+    # number of items exported in parallel, 1 processes them one at a time
+    Workers: 1
+
+    # number of libraries exported at the same time, they take turns on the workers above instead of each getting its own
+    Parallel libraries: 1
+
+    # --watch keeps running and exports items as soon as plex reports them added or changed (--serve below uses these too)
+    # changes are exported once no new one arrived for Watch debounce seconds, or at the latest after Watch max delay seconds
+    # a full pass runs at start and then every Watch full pass interval hours to catch anything missed, 0 only runs the one at start
+    Watch debounce: 10
+    Watch max delay: 120
+    Watch full pass interval: 24
+
+    # --serve accepts plex webhooks (Settings > Webhooks, i.e. http://exporter_ip:32600/) and exports the items they name
+    # library.new and media.rate events are used, they are collected with the Watch settings above and --watch can run alongside
+    Webhook host: 0.0.0.0
+    Webhook port: 32600
+
+    # connection settings shared by every request to plex
+    # failed requests (429/5xx, dropped connections) are retried with exponential backoff: HTTP backoff * 2^retry seconds
+    HTTP pool size: 10 # raised automatically to match Workers
+    HTTP timeout: 30 # seconds
+    HTTP retries: 3
+    HTTP backoff: 0.5
+    Page size: 500 # items per request when paging through long plex listings such as a show's episodes
+    Response cache size: 64 # MB of plex responses kept for the run so stages don't request the same url twice, 0 disables
+
+    # adapt how many requests are in flight to how plex is coping, so exports don't stutter playback
+    # the limit grows while plex answers within Latency target (p95, seconds) and halves when it gets slower or returns 429/5xx
+    Adaptive rate limit: true
+    Max requests in flight: 0 # hard ceiling, 0 uses Workers
+    Max requests per second: 0 # 0 is unlimited
+    Latency target: 1.0
+
+    # processes used to convert non-JPEG artwork (i.e. PNG fanart) to JPEG, 0 converts on the exporting thread
+    # at most one per exporting thread (Workers), auto uses one per CPU core up to that and none with a single worker
+    Image workers: auto
+
+    # ask plex to scale artwork down before downloading it, 0 keeps the original size
+    # posters also apply to season posters, Image quality is the JPEG quality (1-100) plex encodes with, 0 uses plex's default
+    Poster max width: 0
+    Poster max height: 0
+    Fanart max width: 0
+    Fanart max height: 0
+    Image quality: 0
+
+    # copy, hardlink or reflink: how an image already downloaded for an item reaches its other folders (i.e. 4K and 1080p versions), hardlink/reflink fall back to copy across filesystems
+    Duplicate files: copy
+
+    # number of items whose metadata is requested from plex in a single call
+    Metadata batch size: 100
+
     # true/false choose what to export
     Export NFO: true
     Export poster: true
@@ -134,6 +266,7 @@ CONFIG_PLACEHOLDER = dedent("""
 
     # Leave this empty if you use docker volume mapping i.e. Path mapping: []
     # change/add path mapping if plex path is different from local (script) path
+    # plex paths are matched as whole folder prefixes, the longest matching prefix wins
     Path mapping: [
         {
             'plex': '/data_media',
@@ -186,6 +319,9 @@ def resolve_env_file_path():
 def resolve_config_file_path():
     return '/app/config/config.yml' if os.path.isdir('/app/config') else 'config.yml'
 
+def resolve_state_db_path():
+    return '/app/config/state.db' if os.path.isdir('/app/config') else 'state.db'
+
 def required_file_specs():
     return (
         {
@@ -240,39 +376,432 @@ def env_var_constructor(loader, node):
 
     return value
 
-def fallback_response(url, token):
-    start = 0
-    container_size = 1000
-    full_root = None
+def configure_session(config, concurrency):
+    """
+    Build the shared keep-alive session used by every request to Plex, retrying 429/5xx and dropped connections with exponential backoff
+    """
+    global session, http_timeout, page_size
+
+    pool_size = max(resolve_int_option('http_pool_size', None, config, 'HTTP pool size', 10), concurrency)
+    retries = config.get('HTTP retries')
+    retries = 3 if retries is None else int(retries)
+    backoff = float(config.get('HTTP backoff') or 0.5)
+    http_timeout = float(config.get('HTTP timeout') or 30)
+    page_size = resolve_int_option('page_size', None, config, 'Page size', 500)
+    configure_response_cache(config)
+    configure_limiter(config, concurrency)
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'GET'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    logger.debug(f'http session: pool_size={pool_size}, retries={retries}, backoff={backoff}, timeout={http_timeout}')
+
+def configure_response_cache(config):
+    global response_cache_limit
+    cache_size = config.get('Response cache size')
+    try:
+        response_cache_limit = max(0, int(64 if cache_size is None else cache_size)) * 1024 * 1024
+    except (TypeError, ValueError):
+        logger.warning(f'Invalid response cache size value "{cache_size}", falling back to 64')
+        response_cache_limit = 64 * 1024 * 1024
+    reset_response_cache()
+    logger.debug(f'response cache limit is set to {response_cache_limit} bytes.')
+
+def reset_response_cache():
+    global response_cache_bytes
+    with response_cache_lock:
+        response_cache.clear()
+        response_cache_bytes = 0
+        response_cache_stats.update(hits=0, misses=0)
+
+def cache_response(key, response):
+    """
+    Keep a successful response in the cache, evicting the least recently used ones until it fits under the memory cap
+    """
+    global response_cache_bytes
+    size = len(response.content)
+    if size > response_cache_limit:
+        return
+
+    with response_cache_lock:
+        if key in response_cache:
+            return
+        while response_cache and response_cache_bytes + size > response_cache_limit:
+            _, evicted = response_cache.popitem(last=False)
+            response_cache_bytes -= len(evicted.content)
+        response_cache[key] = response
+        response_cache_bytes += size
+
+def configure_limiter(config, concurrency):
+    """
+    Set up the adaptive limiter from config, the ceiling defaults to the number of workers since each has at most one request open
+    """
+    enabled = config.get('Adaptive rate limit')
+    ceiling = int(config.get('Max requests in flight') or 0) or concurrency
+    requests_per_second = float(config.get('Max requests per second') or 0)
+    with limiter_condition:
+        limiter.update(
+            enabled=True if enabled is None else bool(enabled),
+            ceiling=max(1, ceiling),
+            limit=max(1, ceiling // 4),
+            in_flight=0,
+            latency_target=float(config.get('Latency target') or 1.0),
+            interval=1 / requests_per_second if requests_per_second > 0 else 0.0,
+            next_slot=0.0,
+            samples=[],
+            errors=0,
+            backoffs=0,
+        )
+    logger.debug(f"adaptive limiter: enabled={limiter['enabled']}, ceiling={limiter['ceiling']}, latency_target={limiter['latency_target']}, max_rps={requests_per_second or 'unlimited'}")
+
+def acquire_request_slot():
+    with limiter_condition:
+        while limiter['in_flight'] >= limiter['limit']:
+            limiter_condition.wait()
+        limiter['in_flight'] += 1
+
+        delay = 0
+        if limiter['interval']:
+            now = time.monotonic()
+            slot = max(now, limiter['next_slot'])
+            limiter['next_slot'] = slot + limiter['interval']
+            delay = slot - now
 
+    if delay > 0:
+        time.sleep(delay)
+
+def release_request_slot(latency, status_code):
+    """
+    Feed a finished request back to the limiter: 429/5xx or a dropped connection halves the limit at once,
+    otherwise every window of samples either halves it (p95 latency over Latency target) or grows it by one up to the ceiling
+    """
+    with limiter_condition:
+        limiter['in_flight'] -= 1
+        limiter['samples'].append(latency)
+        overloaded = status_code is None or status_code == 429 or status_code >= 500
+
+        window = max(10, limiter['limit'])
+        if overloaded or len(limiter['samples']) >= window:
+            samples = sorted(limiter['samples'])
+            p95 = samples[min(len(samples) - 1, math.ceil(len(samples) * 0.95) - 1)]
+            previous = limiter['limit']
+            if overloaded or p95 > limiter['latency_target']:
+                limiter['limit'] = max(1, previous // 2)
+                limiter['backoffs'] += 1
+            else:
+                limiter['limit'] = min(limiter['ceiling'], previous + 1)
+            limiter['samples'] = []
+            if limiter['limit'] != previous:
+                logger.debug(f"adaptive limiter: {previous} -> {limiter['limit']} requests in flight (p95 {p95:.3f}s, status {status_code})")
+
+        limiter_condition.notify_all()
+
+def limited_get(url, **kwargs):
+    if not limiter['enabled']:
+        return session.get(url, **kwargs)
+
+    acquire_request_slot()
+    started = time.monotonic()
+    status_code = None
+    try:
+        response = session.get(url, **kwargs)
+        status_code = response.status_code
+        return response
+    finally:
+        release_request_slot(time.monotonic() - started, status_code)
+
+def plex_get(url, **kwargs):
+    """
+    GET from plex on the shared session. Buffered responses are memoized for the run,
+    so stages asking for the same url and query (i.e. a show's children for every Location) hit plex once
+    """
+    kwargs.setdefault('timeout', http_timeout)
+    if kwargs.get('stream') or not response_cache_limit:
+        return limited_get(url, **kwargs)
+
+    params = kwargs.get('params') or {}
+    key = (url, urlencode(sorted(params.items())))
+    with response_cache_lock:
+        response = response_cache.get(key)
+        if response is not None:
+            response_cache.move_to_end(key)
+            response_cache_stats['hits'] += 1
+            return response
+        response_cache_stats['misses'] += 1
+
+    response = limited_get(url, **kwargs)
+    if response.status_code == 200:
+        cache_response(key, response)
+    return response
+
+def iter_listing_records(url, item_tag, params=None, info=None, record=None):
+    """
+    Walk a paginated plex listing one page at a time, yielding a lightweight record per item.
+    Each page (at most Page size items) is read in full before parsing, so the connection goes back to the pool right away
+    and memory stays flat regardless of the listing size. The reported totalSize is stored in info['total'] once the first page arrives.
+    """
+    record = record or (lambda element: dict(element.attrib))
+    start = 0
+    total = None
     while True:
-        fallback_headers = {
-            'X-Plex-Token': token,
-            'X-Plex-Container-Start': str(start),
-            'X-Plex-Container-Size': str(container_size)
-        }
-        
-        response = requests.get(url, headers=fallback_headers)
+        page_params = dict(params or {})
+        page_params.update({'X-Plex-Container-Start': start, 'X-Plex-Container-Size': page_size})
+        response = plex_get(url, headers=headers, params=page_params, stream=True)
+        with response:
+            content = response.content
 
         if response.status_code != 200:
-            logger.error(f"Error: {response.status_code}")
-            break
-        
-        root = ET.fromstring(response.content)
+            logger.error(f"Failed to get library info with error code {response.status_code}: {response.text}")
+            if daemon_mode:
+                raise requests.HTTPError(f'{response.status_code} listing {url}', response=response)
+            sys.exit()
+
+        count = 0
+        depth = 0
+        container = None
+        for event, element in ET.iterparse(BytesIO(content), events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    container = element
+                    if total is None and element.get('totalSize') is not None:
+                        total = int(element.get('totalSize'))
+                        if info is not None:
+                            info['total'] = total
+                continue
 
-        if full_root is None:
-            full_root = root
-        else:
-            library_contents = root.findall('Directory')
-            for item in library_contents:
-                full_root.append(item)
+            depth -= 1
+            if depth == 1 and element.tag == item_tag:
+                count += 1
+                yield record(element)
+                container.clear()
+        del content
+
+        start += count
+        if count == 0 or (total is not None and start >= total) or (total is None and count < page_size):
+            break
 
-        if len(root.findall('Directory')) < container_size:
+def iter_container_pages(url, params=None):
+    """
+    Yield each page of a paginated plex listing as a parsed MediaContainer, raising on HTTP errors
+    """
+    start = 0
+    while True:
+        page_params = dict(params or {})
+        page_params.update({'X-Plex-Container-Start': start, 'X-Plex-Container-Size': page_size})
+        response = plex_get(url, headers=headers, params=page_params)
+        response.raise_for_status()
+
+        page = ET.fromstring(response.content)
+        yield page
+
+        count = len(page)
+        start += count
+        total_size = page.get('totalSize')
+        if count < page_size or (total_size and start >= int(total_size)):
             break
 
-        start += container_size
+def open_state_db(path):
+    """
+    Open the persistent export manifest, recording what was last exported for every ratingKey
+    """
+    global state_db
+    state_db = sqlite3.connect(path, check_same_thread=False)
+    state_db.executescript("""
+        CREATE TABLE IF NOT EXISTS items (
+            rating_key TEXT PRIMARY KEY,
+            library_key TEXT,
+            updated_at TEXT,
+            leaf_count TEXT,
+            signature TEXT,
+            exported_at INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            rating_key TEXT,
+            hash TEXT
+        );
+        CREATE TABLE IF NOT EXISTS libraries (
+            sync_key TEXT PRIMARY KEY,
+            last_sync INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS images (
+            path TEXT PRIMARY KEY,
+            url TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            hash TEXT
+        );
+    """)
+    # state written before items kept a fingerprint of a show's episodes and seasons
+    columns = [row[1] for row in state_db.execute('PRAGMA table_info(items)')]
+    if 'children_updated_at' not in columns:
+        state_db.execute('ALTER TABLE items ADD COLUMN children_updated_at TEXT')
+    # and files and images the size and mtime the file had when its hash or validators were recorded
+    for table in ('files', 'images'):
+        columns = [row[1] for row in state_db.execute(f'PRAGMA table_info({table})')]
+        if 'size' not in columns:
+            state_db.execute(f'ALTER TABLE {table} ADD COLUMN size INTEGER')
+            state_db.execute(f'ALTER TABLE {table} ADD COLUMN mtime_ns INTEGER')
+    state_db.commit()
+    logger.debug(f'state database: {path}')
+
+def close_state_db():
+    global state_db
+    if state_db is not None:
+        with state_lock:
+            state_db.commit()
+            state_db.close()
+        state_db = None
+
+def commit_state_db():
+    if state_db is not None:
+        with state_lock:
+            state_db.commit()
+
+def hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_export_signature(config, exports, movie_filename_type, image_filename_type):
+    """
+    Fingerprint of every setting that changes what gets written for an item, a changed setting invalidates the manifest
+    """
+    nfo_keys = ['agent_id', 'ratings', 'roles']
+    nfo_keys += [config_key for config_key, _, _ in SIMPLE_FIELD_MAP + TAG_COLLECTION_MAP + PEOPLE_MAP]
+    settings = {
+        'exports': exports,
+        'nfo': {key: bool(config.get(key)) for key in sorted(nfo_keys)},
+        'movie_filename_type': movie_filename_type,
+        'image_filename_type': image_filename_type,
+        'path_mapping': config.get('Path mapping') or [],
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_manifest(library_key):
+    if state_db is None:
+        return {}
 
-    return response
+    with state_lock:
+        rows = state_db.execute('SELECT rating_key, updated_at, leaf_count, children_updated_at, signature FROM items WHERE library_key = ?', (library_key,)).fetchall()
+
+    return {rating_key: entry for rating_key, *entry in rows}
+
+def is_unchanged(manifest, content, signature):
+    """
+    True if the listing entry matches what was last exported, shows also compare leafCount so new episodes are picked up
+    and the newest updatedAt of their episodes and seasons, which editing those leaves untouched on the show
+    """
+    entry = manifest.get(content.get('ratingKey'))
+    if entry is None:
+        return False
+
+    return entry == [content.get('updatedAt'), content.get('leafCount'), content.get('childrenUpdatedAt'), signature]
+
+def record_item(library_key, content, signature):
+    if state_db is None:
+        return
+
+    with state_lock:
+        state_db.execute(
+            'INSERT OR REPLACE INTO items (rating_key, library_key, updated_at, leaf_count, children_updated_at, signature, exported_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (content.get('ratingKey'), library_key, content.get('updatedAt'), content.get('leafCount'), content.get('childrenUpdatedAt'), signature, int(datetime.now().timestamp())),
+        )
+
+def get_last_sync(sync_key):
+    if state_db is None:
+        return None
+
+    with state_lock:
+        row = state_db.execute('SELECT last_sync FROM libraries WHERE sync_key = ?', (sync_key,)).fetchone()
+
+    return row[0] if row else None
+
+def record_sync(sync_key, sync_time):
+    if state_db is None:
+        return
+
+    with state_lock:
+        state_db.execute('INSERT OR REPLACE INTO libraries (sync_key, last_sync) VALUES (?, ?)', (sync_key, sync_time))
+        state_db.commit()
+
+def get_file_hash(path):
+    """
+    Hash recorded when path was last written, only while the file on disk still has the size and mtime it had then,
+    so a file edited by hand (or rewritten by another media server) is read back instead of trusted
+    """
+    if state_db is None:
+        return None
+
+    with state_lock:
+        row = state_db.execute('SELECT hash, size, mtime_ns FROM files WHERE path = ?', (path,)).fetchone()
+
+    if row is None:
+        return None
+
+    stat = file_stat(path)
+    if stat is None or (stat.st_size, stat.st_mtime_ns) != (row[1], row[2]):
+        return None
+    return row[0]
+
+def record_file(path, rating_key, file_hash=None):
+    if state_db is None:
+        return
+
+    file_hash = file_hash or hash_file(path)
+    stat = os.stat(path)
+    with state_lock:
+        state_db.execute(
+            'INSERT OR REPLACE INTO files (path, rating_key, hash, size, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+            (path, rating_key, file_hash, stat.st_size, stat.st_mtime_ns),
+        )
+
+def get_image_validators(path, url):
+    """
+    ETag and Last-Modified plex sent for the image at path, only if it came from the same url
+    and the file on disk still has the size and mtime it had when it was written
+    """
+    if state_db is None:
+        return None
+
+    with state_lock:
+        row = state_db.execute('SELECT etag, last_modified, size, mtime_ns FROM images WHERE path = ? AND url = ?', (path, url)).fetchone()
+
+    if row is None or not (row[0] or row[1]):
+        return None
+
+    stat = file_stat(path)
+    if stat is None or (stat.st_size, stat.st_mtime_ns) != (row[2], row[3]):
+        logger.debug(f'{path} changed on disk since it was downloaded, not revalidating it')
+        return None
+    return row[0], row[1]
+
+def record_image(path, url, etag, last_modified, file_hash, rating_key):
+    if state_db is None:
+        return
+
+    stat = os.stat(path)
+    with state_lock:
+        state_db.execute(
+            'INSERT OR REPLACE INTO images (path, url, etag, last_modified, hash, size, mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (path, url, etag, last_modified, file_hash, stat.st_size, stat.st_mtime_ns),
+        )
+    record_file(path, rating_key, file_hash)
 
 def get_library_details(plex_url:str, headers:dict, library_names:list, blacklists:list | None=None) -> list:
     """
@@ -281,7 +810,7 @@ def get_library_details(plex_url:str, headers:dict, library_names:list, blacklis
     library_details = []
     if plex_url:
         url = urljoin(plex_url, 'library/sections')
-        response = requests.get(url, headers=headers)
+        response = plex_get(url, headers=headers)
 
         if response.status_code == 200:
             root = ET.fromstring(response.content)
@@ -307,9 +836,44 @@ def get_library_details(plex_url:str, headers:dict, library_names:list, blacklis
                 # else:
                 #     logger.warning(f'Library "{search_library}" not found in Plex.')
 
-    return library_details
+    # music libraries used to be listed twice, each library is exported in one pass now
+    return list({library['key']: library for library in library_details}.values())
 
-def get_media_path(library_type, meta_root, meta_url, path_mapping, headers):
+def compile_path_mapping(path_mapping):
+    """
+    Build a prefix table from the configured mappings, longest plex prefix first so overlapping prefixes resolve to the most specific one.
+    Mapped directories are memoized in the returned matcher.
+    """
+    prefixes = [(entry.get('plex'), entry.get('local')) for entry in path_mapping or [] if entry.get('plex')]
+    prefixes.sort(key=lambda prefix: len(prefix[0]), reverse=True)
+    return {'prefixes': prefixes, 'directories': {}}
+
+def map_directory(path_mapping, directory):
+    mapped = path_mapping['directories'].get(directory)
+    if mapped is None:
+        mapped = directory
+        for plex_prefix, local_prefix in path_mapping['prefixes']:
+            if not directory.startswith(plex_prefix):
+                continue
+            # only match whole path components, /media/tv must not map /media/tv2
+            if len(directory) == len(plex_prefix) or plex_prefix[-1] in '/\\' or directory[len(plex_prefix)] in '/\\':
+                mapped = local_prefix + directory[len(plex_prefix):]
+                break
+        path_mapping['directories'][directory] = mapped
+    return mapped
+
+def map_path(path_mapping, path):
+    """
+    Translate a plex path to the local path with a single lookup of its directory in the matcher
+    """
+    if not path_mapping['prefixes']:
+        return path
+    split_at = path.rfind('/') + 1
+    if not split_at:
+        return map_directory(path_mapping, path)
+    return map_directory(path_mapping, path[:split_at]) + path[split_at:]
+
+def get_media_path(library_type, meta_root, meta_url, path_mapping, headers, album_folders=None):
     if library_type == 'movie':
         media_path_parts = meta_root.findall('.//Part')
         media_paths = []
@@ -318,9 +882,7 @@ def get_media_path(library_type, meta_root, meta_url, path_mapping, headers):
         media_path_dirty = {path_member[:path_member.rfind("/")]+"/" for path_member in media_paths}
         media_path_final = []
         for path_member in media_path_dirty:
-            for path_list in path_mapping:
-                path_member = path_member.replace(path_list.get('plex'), path_list.get('local'))
-            media_path_final.append(path_member)
+            media_path_final.append(map_path(path_mapping, path_member))
 
         return media_path_final
     
@@ -331,21 +893,18 @@ def get_media_path(library_type, meta_root, meta_url, path_mapping, headers):
             media_paths.append(media_part.get('path')+'/')
         media_path_final = []
         for path_member in media_paths:
-            for path_list in path_mapping:
-                path_member = path_member.replace(path_list.get('plex'), path_list.get('local'))
-            media_path_final.append(path_member)
+            media_path_final.append(map_path(path_mapping, path_member))
 
         return media_path_final
     
     elif library_type == 'albums':
-        track_url = urljoin(meta_url, '/children')
-        track_response = requests.get(track_url, headers=headers)
-        track0_path = ET.fromstring(track_response.content).findall('Track')[0].find('Media/Part').get('file')
-        media_path = track0_path[:track0_path.rfind('/')]+'/'
+        media_path = (album_folders or {}).get(meta_root.get('ratingKey'))
+        if media_path is None:
+            track_response = plex_get(f'{meta_url}/children', headers=headers)
+            track0_path = ET.fromstring(track_response.content).findall('Track')[0].find('Media/Part').get('file')
+            media_path = track0_path[:track0_path.rfind('/')]+'/'
         media_path_final = []
-        for path_list in path_mapping:
-            media_path = media_path.replace(path_list.get('plex'), path_list.get('local'))
-        media_path_final.append(media_path)
+        media_path_final.append(map_path(path_mapping, media_path))
 
         return media_path_final
     
@@ -382,49 +941,223 @@ def get_file_path(library_type, movie_filename_type, image_filename_type, media_
 
     return nfo_path, poster_path, fanart_path
 
-def download_image(url:str, headers:dict, save_path:str) -> None:
+def write_atomic(save_path, chunks):
     """
-    Download image from provided url, also convert RGBA to RGB
+    Write chunks to a temporary file next to save_path and move it into place, so readers never see a partial file
     """
+    temp_path = f'{save_path}.part'
     try:
-        headers = headers.copy()
-        headers["Accept-Encoding"] = "gzip"
+        with open(temp_path, 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        os.replace(temp_path, save_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def reflink_file(source_path, target_path):
+    if fcntl is None:
+        raise OSError('reflink is not supported on this platform')
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+def link_or_copy(source_path, save_path):
+    """
+    Put a copy of source_path at save_path as configured by Duplicate files,
+    hardlink and reflink fall back to a plain copy when the filesystem refuses (i.e. the targets are on different drives)
+    """
+    temp_path = f'{save_path}.part'
+    if duplicate_mode != 'copy':
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if duplicate_mode == 'hardlink':
+                os.link(source_path, temp_path)
+            else:
+                reflink_file(source_path, temp_path)
+            os.replace(temp_path, save_path)
+            return
+        except OSError as exc:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            logger.debug(f'{duplicate_mode} from {source_path} to {save_path} failed ({exc}), copying instead')
 
-        response = requests.get(url, headers=headers, stream=True)
+    with open(source_path, 'rb') as source:
+        write_atomic(save_path, iter(lambda: source.read(IMAGE_CHUNK_SIZE), b''))
 
-        if response.status_code == 200:
-            content_type = response.headers.get("Content-Type", "")
-            if not content_type.startswith("image/"):
-                # Save raw content for debugging
-                # with open("debug_response.bin", "wb") as f:
-                #     for chunk in response.iter_content(8192):
-                #         f.write(chunk)
-                logger.verbose(f"[ERROR] Invalid content type: {content_type}, URL: {url}")
-                return False
+def configure_images(config, concurrency):
+    """
+    Size the image worker pool. An exporting thread waits for its own conversion while the other threads keep fetching,
+    so more processes than exporting threads would sit idle and a single thread gains nothing from the pool
+    """
+    global image_pool_size, image_quality
+    value = config.get('Image workers')
+    if value is None:
+        value = 'auto'
+    if str(value).lower() == 'auto':
+        image_pool_size = min(os.cpu_count() or 1, concurrency) if concurrency > 1 else 0
+    else:
+        try:
+            image_pool_size = min(max(0, int(value)), concurrency)
+        except (TypeError, ValueError):
+            logger.warning(f'Invalid Image workers value "{value}", transcoding on the exporting thread')
+            image_pool_size = 0
+    logger.debug(f'image_pool_size is set to {image_pool_size}.')
+
+    for kind, label in (('poster', 'Poster'), ('fanart', 'Fanart')):
+        image_sizes[kind] = (int(config.get(f'{label} max width') or 0), int(config.get(f'{label} max height') or 0))
+    image_quality = int(config.get('Image quality') or 0)
+    logger.debug(f'image_sizes: {image_sizes}, image_quality: {image_quality}')
+
+    global duplicate_mode
+    duplicate_mode = str(config.get('Duplicate files') or 'copy').lower()
+    if duplicate_mode not in DUPLICATE_MODES:
+        logger.warning(f'Invalid Duplicate files value "{duplicate_mode}", falling back to copy')
+        duplicate_mode = 'copy'
+    logger.debug(f'duplicate_mode is set to {duplicate_mode}.')
+
+def build_image_url(kind, image_key):
+    """
+    Full url of a poster/fanart, going through plex's photo transcoder when a maximum size is configured for that kind
+    """
+    width, height = image_sizes[kind]
+    if not (width or height):
+        return urljoin(baseurl, image_key)
+
+    # the transcoder fits the image inside width x height, an unset side is left unbounded
+    params = {
+        'url': image_key,
+        'width': width or PHOTO_TRANSCODE_UNBOUNDED,
+        'height': height or PHOTO_TRANSCODE_UNBOUNDED,
+        'upscale': 0,
+        'format': 'jpeg',
+    }
+    if image_quality:
+        params['quality'] = image_quality
+
+    return urljoin(baseurl, '/photo/:/transcode') + '?' + urlencode(params)
+
+def get_image_pool():
+    # started on first use so runs that only see JPEGs never spawn it
+    global image_pool
+    if image_pool_size <= 0:
+        return None
+
+    with image_pool_lock:
+        if image_pool is None:
+            image_pool = ProcessPoolExecutor(max_workers=image_pool_size, mp_context=multiprocessing.get_context('spawn'))
+        return image_pool
+
+def shutdown_image_pool():
+    global image_pool
+    with image_pool_lock:
+        if image_pool is not None:
+            image_pool.shutdown()
+            image_pool = None
+
+def transcode_image(data, image_format):
+    """
+    Decode image bytes, convert RGBA/P to RGB and re-encode them, runs inside the image worker processes
+    """
+    image = Image.open(BytesIO(data))
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("RGB")
+    output = BytesIO()
+    image.save(output, format=image_format)
+    return output.getvalue()
+
+def download_image(url:str, headers:dict, save_path:str, rating_key:str | None=None, revalidate:bool=False) -> None:
+    """
+    Download image from provided url. JPEGs are streamed to disk untouched,
+    anything else is transcoded by transcode_image on the image worker pool (or this thread without one).
+    With revalidate, the ETag/Last-Modified remembered for save_path are sent and UNCHANGED is returned on a 304.
+    """
+    try:
+        validators = get_image_validators(save_path, url) if revalidate else None
+        if validators:
+            headers = headers.copy()
+            etag, last_modified = validators
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = plex_get(url, headers=headers, stream=True)
+        # streamed responses only go back to the session's pool once closed, whichever way this returns
+        with response:
+            if response.status_code == 304 and validators:
+                return UNCHANGED
+
+            if response.status_code == 200:
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith("image/"):
+                    logger.verbose(f"[ERROR] Invalid content type: {content_type}, URL: {url}")
+                    return False
+
+                # iter_content takes care of any gzip transfer encoding
+                chunks = response.iter_content(chunk_size=IMAGE_CHUNK_SIZE)
+                head = b''
+                for chunk in chunks:
+                    head += chunk
+                    if len(head) >= len(JPEG_MAGIC):
+                        break
+
+                digest = hashlib.sha1()
+
+                def hashed(parts):
+                    for part in parts:
+                        digest.update(part)
+                        yield part
+
+                if head.startswith(JPEG_MAGIC):
+                    write_atomic(save_path, hashed(itertools.chain([head], chunks)))
+                else:
+                    data = head + b''.join(chunks)
+                    image_format = Image.registered_extensions().get(os.path.splitext(save_path)[1].lower(), 'JPEG')
+                    pool = get_image_pool()
+                    if pool is not None:
+                        converted = pool.submit(transcode_image, data, image_format).result()
+                    else:
+                        converted = transcode_image(data, image_format)
+                    write_atomic(save_path, hashed([converted]))
+
+                record_image(save_path, url, response.headers.get('ETag'), response.headers.get('Last-Modified'), digest.hexdigest(), rating_key)
+                return True
 
-            # Manually decompress if needed
-            if response.headers.get("Content-Encoding") == "gzip":
-                buffer = BytesIO(response.raw.read())
-                decompressed = gzip.GzipFile(fileobj=buffer).read()
-                image_data = BytesIO(decompressed)
+            elif response.status_code == 404:
+                logger.verbose('[FAILURE] Image does not exist')
+                return False
             else:
-                image_data = BytesIO(response.content)
+                logger.verbose(f"[FAILURE] Download Image HTTP Response: {response.status_code}")
+                return False
 
-            image = Image.open(image_data)
-            if image.mode in ("RGBA", "P"):
-                image = image.convert("RGB")
-            image.save(save_path)
-            return True
+    except Exception as e:
+        logger.verbose(f"[FAILURE] Download Image failed: {e}")
+        return False
 
-        elif response.status_code == 404:
-            logger.verbose('[FAILURE] Image does not exist')
-            return False
-        else:
-            logger.verbose(f"[FAILURE] Download Image HTTP Response: {response.status_code}")
-            return False
+def duplicate_image(source_path:str, url:str, save_path:str, rating_key:str | None=None, file_exists:bool=False, verify:bool=False):
+    """
+    Fan an image already downloaded for this item out to another of its folders instead of downloading it again,
+    returns UNCHANGED when save_path already holds the same file. The target's recorded hash is only used while the file
+    still has the size and mtime it was recorded with, with verify (Force overwrite) it is always hashed
+    """
+    try:
+        source_hash = get_file_hash(source_path) or hash_file(source_path)
+        validators = get_image_validators(source_path, url) or (None, None)
+        target_hash = None
+        if file_exists and not os.path.samefile(source_path, save_path):
+            target_hash = (None if verify else get_file_hash(save_path)) or hash_file(save_path)
+        if file_exists and (target_hash is None or target_hash == source_hash):
+            record_image(save_path, url, validators[0], validators[1], source_hash, rating_key)
+            return UNCHANGED
+
+        link_or_copy(source_path, save_path)
+        record_image(save_path, url, validators[0], validators[1], source_hash, rating_key)
+        return True
 
     except Exception as e:
-        logger.verbose(f"[FAILURE] Download Image failed: {e}")
+        logger.verbose(f"[FAILURE] Copying image from {source_path} failed: {e}")
         return False
 
 SIMPLE_FIELD_MAP = [
@@ -452,195 +1185,292 @@ PEOPLE_MAP = [
 ]
 
 
+def build_render_plan(config:dict) -> dict:
+    """
+    Resolve which NFO fields are enabled once per run, so rendering an item doesn't consult the config again
+    """
+    return {
+        'agent_id': bool(config.get('agent_id')),
+        'simple_fields': [(attribute, tag) for config_key, attribute, tag in SIMPLE_FIELD_MAP if config.get(config_key)],
+        'tag_collections': {element_name: tag for config_key, element_name, tag in TAG_COLLECTION_MAP if config.get(config_key)},
+        'ratings': bool(config.get('ratings')),
+        'people': {element_name: tag for config_key, element_name, tag in PEOPLE_MAP if config.get(config_key)},
+        'roles': bool(config.get('roles')),
+    }
 
 
+def render_person(tag_name, person, with_role=False):
+    parts = [f"  <{tag_name}"]
+    thumb = person.get('thumb')
+    if thumb:
+        parts.append(f' thumb="{thumb}"')
+    if with_role:
+        role_name = person.get('role')
+        if role_name:
+            parts.append(f' role="{role_name}"')
+    parts.append(f'>{person.get("tag")}</{tag_name}>')
+    return ''.join(parts)
 
 
+def render_nfo(plan:dict, library_type:str, meta_root) -> str:
+    """
+    Render an NFO from a render plan in a single pass over the metadata element's children.
+    Sections are collected separately and joined in their fixed order: agent ids, simple fields, tag collections, ratings, people, roles.
+    """
+    agent_lines = []
+    collection_lines = {element_name: [] for element_name in plan['tag_collections']}
+    rating_lines = []
+    has_ratings = False
+    people_lines = {element_name: [] for element_name in plan['people']}
+    role_lines = []
+
+    for child in meta_root:
+        element_name = child.tag
+        if element_name == 'Guid':
+            if plan['agent_id']:
+                aid = child.get('id', '')
+                if aid:
+                    tag = aid.split(':')[0] + 'id'
+                    agent_lines.append(f"  <{tag}>{aid.split('//')[-1]}</{tag}>")
+        elif element_name in collection_lines:
+            value = child.get('tag')
+            if value:
+                tag_name = plan['tag_collections'][element_name]
+                collection_lines[element_name].append(f"  <{tag_name}>{value}</{tag_name}>")
+        elif element_name == 'Rating':
+            if plan['ratings']:
+                has_ratings = True
+                rating_type = child.get('type')
+                value = child.get('value')
+                if rating_type and value:
+                    rating_lines.append(f"    <{rating_type}>{value}</{rating_type}>")
+        elif element_name in people_lines:
+            if child.get('tag'):
+                people_lines[element_name].append(render_person(plan['people'][element_name], child))
+        elif element_name == 'Role':
+            if plan['roles'] and child.get('tag'):
+                role_lines.append(render_person('actor', child, with_role=True))
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<{library_type} xsi="http://www.w3.org/2001/XMLSchema-instance" xsd="http://www.w3.org/2001/XMLSchema">',
+    ]
 
+    guid = meta_root.get('guid') if plan['agent_id'] else None
+    if guid:
+        if 'themoviedb' in guid:
+            lines.append(f"  <tmdbid>{guid.split('//')[-1].split('?')[0]}</tmdbid>")
+        if 'agents.hama' in guid:
+            prefix = guid.split('//')[-1].split('-')[0]
+            id_part = guid.split('-')[-1].split('?')[0]
+            lines.append(f"  <{prefix}id>{id_part}</{prefix}id>")
+        lines.extend(agent_lines)
+
+    for attribute, tag in plan['simple_fields']:
+        value = meta_root.get(attribute)
+        if value:
+            lines.append(f"  <{tag}>{value}</{tag}>")
+
+    for element_lines in collection_lines.values():
+        lines.extend(element_lines)
+
+    if has_ratings:
+        lines.append('  <ratings>')
+        lines.extend(rating_lines)
+        lines.append('  </ratings>')
+
+    for element_lines in people_lines.values():
+        lines.extend(element_lines)
+
+    lines.extend(role_lines)
+    lines.append(f'</{library_type}>')
+    return '\n'.join(lines)
+
+def render_episode_nfo(episode_root) -> str:
+    nfo = StringIO()
+    nfo.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    nfo.write('<episodedetails xsi="http://www.w3.org/2001/XMLSchema-instance" xsd="http://www.w3.org/2001/XMLSchema">\n')
+
+    if episode_root.findall('Guid'):
+        for guid in episode_root.findall('Guid'):
+            gid = guid.get("id")
+            if 'imdb' in guid.get('id'):
+                utype = 'imdb'
+            elif 'tmdb' in guid.get('id'):
+                utype = 'tmdb'
+            elif 'tvdb' in guid.get('id'):
+                utype = 'tvdb'
+
+            nfo.write(f'  <uniqueid type="{utype}">{gid.rsplit("/", 1)[-1]}</uniqueid>\n')
+
+    fields = {
+        'parentIndex': 'season',
+        'index': 'episode',
+        'title': 'title',
+        'summary': 'plot',
+        'contentRating': 'mpaa',
+        'rating': 'userrating',
+        'originallyAvailableAt': 'aired',
+    }
 
+    for attr, tag in fields.items():
+        value = episode_root.get(attr)
+        if value:
+            nfo.write(f'  <{tag}>{value}</{tag}>\n')
 
+    nfo.write('</episodedetails>')
+    return nfo.getvalue()
 
+def save_nfo(nfo_path:str, content:str, rating_key:str, file_exists:bool, verify:bool=False):
+    """
+    Write a rendered NFO unless the file already holds exactly this content, in which case UNCHANGED is returned.
+    The existing content is checked against the hash recorded when it was written, and read back without a usable one
+    or with verify (Force overwrite).
+    """
+    content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    if file_exists:
+        recorded_hash = None if verify else get_file_hash(nfo_path)
+        if recorded_hash is not None:
+            unchanged = recorded_hash == content_hash
+        else:
+            with open(nfo_path, 'r', encoding='utf-8', errors='replace') as existing:
+                unchanged = existing.read() == content
+        if unchanged:
+            record_file(nfo_path, rating_key, content_hash)
+            return UNCHANGED
 
+    temp_path = f'{nfo_path}.part'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as nfo:
+            nfo.write(content)
+        os.replace(temp_path, nfo_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+                logger.verbose(f"[CLEANUP] Incomplete NFO at {temp_path} has been removed")
+            except Exception as rm_err:
+                logger.verbose(f"[CLEANUP] Failed to remove incomplete NFO at {temp_path}: {rm_err}")
+        raise
 
+    record_file(nfo_path, rating_key, content_hash)
+    return True
 
+def write_nfo(config:dict, nfo_path:str, library_type:str, meta_root:str, media_title:str, file_exists:bool=False, fan_out:dict | None=None, verify:bool=False) -> None:
+    try:
+        content = fan_out.get('NFO') if fan_out is not None else None
+        if content is None:
+            content = render_nfo(render_plan, library_type, meta_root)
+            if fan_out is not None:
+                fan_out['NFO'] = content
+        return save_nfo(nfo_path, content, meta_root.get('ratingKey'), file_exists, verify)
 
+    except Exception as e:
+        logger.verbose(f"[FAILURE] Failed to write NFO for {media_title} due to {e}")
+        return False
 
-def write_line(nfo, line):
-    nfo.write(line)
-    nfo.write(chr(10))
-
-
-def write_agent_ids_section(nfo, config, meta_root):
-    if not config.get('agent_id'):
-        return
-
-    guid = meta_root.get('guid')
-    if not guid:
-        return
-
-    if 'themoviedb' in guid:
-        write_line(nfo, f"  <tmdbid>{guid.split('//')[-1].split('?')[0]}</tmdbid>")
-
-    if 'agents.hama' in guid:
-        prefix = guid.split('//')[-1].split('-')[0]
-        id_part = guid.split('-')[-1].split('?')[0]
-        write_line(nfo, f"  <{prefix}id>{id_part}</{prefix}id>")
-
-    for agent in meta_root.findall('Guid'):
-        aid = agent.get('id', '')
-        if not aid:
-            continue
-        tag = aid.split(':')[0] + 'id'
-        value = aid.split('//')[-1]
-        write_line(nfo, f"  <{tag}>{value}</{tag}>")
-
-
-def write_simple_fields(nfo, config, meta_root):
-    for config_key, attribute, tag in SIMPLE_FIELD_MAP:
-        if config.get(config_key) and meta_root.get(attribute):
-            write_line(nfo, f"  <{tag}>{meta_root.get(attribute)}</{tag}>")
-
-
-def write_tag_collections(nfo, config, meta_root):
-    for config_key, element_name, tag_name in TAG_COLLECTION_MAP:
-        if not config.get(config_key):
-            continue
-        for element in meta_root.findall(element_name):
-            value = element.get('tag')
-            if value:
-                write_line(nfo, f"  <{tag_name}>{value}</{tag_name}>")
-
-
-def write_ratings_section(nfo, config, meta_root):
-    if not config.get('ratings'):
-        return
-
-    ratings = list(meta_root.findall('Rating'))
-    if not ratings:
-        return
-
-    write_line(nfo, '  <ratings>')
-    for rating in ratings:
-        rating_type = rating.get('type')
-        value = rating.get('value')
-        if rating_type and value:
-            write_line(nfo, f"    <{rating_type}>{value}</{rating_type}>")
-    write_line(nfo, '  </ratings>')
+def write_episode_nfo(episode_nfo_path, episode_root, media_title, file_exists=False, verify=False):
+    try:
+        return save_nfo(episode_nfo_path, render_episode_nfo(episode_root), episode_root.get('ratingKey'), file_exists, verify)
 
+    except Exception as e:
+        logger.verbose(f'[ERROR] Failed to write episode NFO for {media_title} due to {e}')
+        return False
 
-def write_people_sections(nfo, config, meta_root):
-    for config_key, element_name, tag_name in PEOPLE_MAP:
-        if not config.get(config_key):
-            continue
-        for person in meta_root.findall(element_name):
-            label = person.get('tag')
-            if not label:
-                continue
-            parts = [f"  <{tag_name}"]
-            thumb = person.get('thumb')
-            if thumb:
-                parts.append(f' thumb="{thumb}"')
-            parts.append(f'>{label}</{tag_name}>')
-            write_line(nfo, ''.join(parts))
+def write_artifact(type, config, file_path, library_type, media_root, media_title, file_exists, season_dir='', season_path='', fan_out=None, verify=False):
+    """
+    Write one NFO or image, returns True on success, False on failure,
+    or UNCHANGED when the file on disk already matches (identical NFO, or plex confirmed the image is current).
+    fan_out holds what was already rendered or downloaded for the item, so its other folders reuse it,
+    verify compares against the files' actual contents instead of the hashes recorded for them
+    """
+    target_path = season_path or file_path
+    if type == 'NFO':
+        return write_nfo(config, file_path, library_type, media_root, media_title, file_exists, fan_out, verify)
+    elif type == 'Episode NFO':
+        return write_episode_nfo(file_path, media_root, media_title, file_exists, verify)
+    elif type in ('Poster', 'Season Poster', 'Art'):
+        if type == 'Poster':
+            url = build_image_url('poster', media_root.get('thumb'))
+        elif type == 'Season Poster':
+            url = build_image_url('poster', season_dir.get('thumb'))
+        else:
+            url = build_image_url('fanart', media_root.get('art'))
 
+        source_path = fan_out.get(url) if fan_out is not None else None
+        if source_path:
+            return duplicate_image(source_path, url, target_path, media_root.get('ratingKey'), file_exists, verify)
 
-def write_roles_section(nfo, config, meta_root):
-    if not config.get('roles'):
-        return
+        status = download_image(url, headers, target_path, media_root.get('ratingKey'), revalidate=file_exists)
+        if status and fan_out is not None:
+            fan_out[url] = target_path
+        return status
 
-    for role in meta_root.findall('Role'):
-        label = role.get('tag')
-        if not label:
-            continue
-        parts = ['  <actor']
-        thumb = role.get('thumb')
-        if thumb:
-            parts.append(f' thumb="{thumb}"')
-        role_name = role.get('role')
-        if role_name:
-            parts.append(f' role="{role_name}"')
-        parts.append(f'>{label}</actor>')
-        write_line(nfo, ''.join(parts))
+    return False
 
+def list_directory(directory):
+    """
+    Return the cached listing of a directory, scanning it once per run, or None when it doesn't exist
+    """
+    if directory in dir_cache:
+        return dir_cache[directory]
 
-def write_nfo(config:dict, nfo_path:str, library_type:str, meta_root:str, media_title:str) -> None:
     try:
-        with open(nfo_path, 'w', encoding='utf-8') as nfo:
-            write_line(nfo, '<?xml version="1.0" encoding="UTF-8"?>')
-            write_line(nfo, f'<{library_type} xsi="http://www.w3.org/2001/XMLSchema-instance" xsd="http://www.w3.org/2001/XMLSchema">')
+        with os.scandir(directory) as entries:
+            listing = {entry.name: entry for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        listing = None
 
-            write_agent_ids_section(nfo, config, meta_root)
-            write_simple_fields(nfo, config, meta_root)
-            write_tag_collections(nfo, config, meta_root)
-            write_ratings_section(nfo, config, meta_root)
-            write_people_sections(nfo, config, meta_root)
-            write_roles_section(nfo, config, meta_root)
+    with dir_cache_lock:
+        return dir_cache.setdefault(directory, listing)
 
-            nfo.write(f'</{library_type}>')
-
-            return True
+def lookup_file(path):
+    """
+    Answer existence checks from the directory cache, returns (directory exists, file exists)
+    """
+    listing = list_directory(os.path.dirname(path))
+    if listing is None:
+        return False, False
+    return True, os.path.basename(path) in listing
 
-    except Exception as e:
-        logger.verbose(f"[FAILURE] Failed to write NFO for {media_title} due to {e}")
-        if os.path.exists(nfo_path):
-            try:
-                os.remove(nfo_path)
-                logger.verbose(f"[CLEANUP] Incomplete NFO at {nfo_path} has been removed")
-            except Exception as rm_err:
-                logger.verbose(f"[CLEANUP] Failed to remove incomplete NFO at {nfo_path}: {rm_err}")
-        return False
+def file_mtime(path):
+    """
+    Modification time of a file known to exist, DirEntry caches its own stat so each file is stat'ed at most once per run
+    """
+    entry = list_directory(os.path.dirname(path))[os.path.basename(path)]
+    if isinstance(entry, os.DirEntry):
+        return entry.stat().st_mtime
+    return entry
 
-def write_episode_nfo(episode_nfo_path, episode_root, media_title):
+def file_stat(path):
+    """
+    stat of a file from its cached DirEntry, files written during this run (or missing from the cache) are stat'ed again, None if it does not exist
+    """
+    listing = list_directory(os.path.dirname(path)) or {}
+    entry = listing.get(os.path.basename(path))
     try:
-        with open(episode_nfo_path, 'w', encoding='utf-8') as nfo:
-            nfo.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            nfo.write('<episodedetails xsi="http://www.w3.org/2001/XMLSchema-instance" xsd="http://www.w3.org/2001/XMLSchema">\n')
-
-            if episode_root.findall('Guid'):
-                for guid in episode_root.findall('Guid'):
-                    gid = guid.get("id")
-                    if 'imdb' in guid.get('id'):
-                        utype = 'imdb'
-                    elif 'tmdb' in guid.get('id'):
-                        utype = 'tmdb'
-                    elif 'tvdb' in guid.get('id'):
-                        utype = 'tvdb'
-                                            
-                    nfo.write(f'  <uniqueid type="{utype}">{gid.rsplit("/", 1)[-1]}</uniqueid>\n')
-
-            fields = {
-                'parentIndex': 'season',
-                'index': 'episode',
-                'title': 'title',
-                'summary': 'plot',
-                'contentRating': 'mpaa',
-                'rating': 'userrating',
-                'originallyAvailableAt': 'aired',
-            }
-
-            for attr, tag in fields.items():
-                value = episode_root.get(attr)
-                if value:
-                    nfo.write(f'  <{tag}>{value}</{tag}>\n')
-
-            nfo.write('</episodedetails>')
-
-            return True
+        if isinstance(entry, os.DirEntry):
+            return entry.stat()
+        return os.stat(path)
+    except OSError:
+        return None
 
-    except Exception as e:
-        logger.verbose(f'[ERROR] Failed to write episode NFO for {media_title} due to {e}')
-        if os.path.exists(episode_nfo_path):
-            try:
-                os.remove(episode_nfo_path)
-                logger.verbose(f'[CLEANUP] Incomplete Episode NFO at {episode_nfo_path} has been removed')
-            except Exception as rm_err:
-                logger.verbose(f'[CLEANUP] Failed to remove incomplete Episode NFO at {episode_nfo_path}: {rm_err}')
-
-        return False
-    
-def process_media(type, config, file_path, library_type, media_root, media_title, dry_run, force_overwrite, season_dir='', season_path=''):
-    file_exists = os.path.exists(season_path or file_path)
-    if not os.path.exists(os.path.dirname(season_path or file_path)):
+def remember_file(path):
+    """
+    Record a file written during this run so later checks on the same path see it without going back to disk
+    """
+    listing = list_directory(os.path.dirname(path))
+    if listing is not None:
+        with dir_cache_lock:
+            listing[os.path.basename(path)] = time.time()
+
+def reset_directory_cache():
+    with dir_cache_lock:
+        dir_cache.clear()
+
+def process_media(type, config, file_path, library_type, media_root, media_title, dry_run, force_overwrite, season_dir='', season_path='', fan_out=None):
+    dir_exists, file_exists = lookup_file(season_path or file_path)
+    if not dir_exists:
         logger.verbose(f'[FAILURE] {type} for {media_title} skipped because {os.path.dirname(season_path or file_path)} is not exist')
         return 'not_exist'
     elif dry_run:
@@ -650,23 +1480,16 @@ def process_media(type, config, file_path, library_type, media_root, media_title
     else:
         try:
             if file_exists:
-                file_mod_time = int(os.path.getmtime(season_path or file_path))
+                file_mod_time = int(file_mtime(season_path or file_path))
                 server_mod_time = int(media_root.get('updatedAt') or 0)
                 if (file_mod_time < server_mod_time) or force_overwrite:
-                    if type == 'NFO':
-                        file_status = write_nfo(config, file_path, library_type, media_root, media_title)
-                    elif type == 'Episode NFO':
-                        file_status = write_episode_nfo(file_path, media_root, media_title)
-                    elif type in ('Poster', 'Season Poster', 'Art'):
-                        if type == 'Poster':
-                            url = urljoin(baseurl, media_root.get('thumb'))
-                        elif type == 'Season Poster':
-                            url = urljoin(baseurl, season_dir.get('thumb'))
-                        else:
-                            url = urljoin(baseurl, media_root.get('art'))
-                        file_status = download_image(url, headers, season_path or file_path)
-
-                    if file_status:
+                    file_status = write_artifact(type, config, file_path, library_type, media_root, media_title, file_exists, season_dir, season_path, fan_out, force_overwrite)
+
+                    if file_status == UNCHANGED:
+                        logger.verbose(f'[UNCHANGED] {type} for {media_title} not rewritten because {season_path or file_path} is already up-to-date')
+                        return 'unchanged'
+                    elif file_status:
+                        remember_file(season_path or file_path)
                         logger.verbose(f'[UPDATED] {type} for {media_title} successfully saved to {season_path or file_path}')
                         return 'updated'
                     else:
@@ -675,20 +1498,10 @@ def process_media(type, config, file_path, library_type, media_root, media_title
                     logger.verbose(f'[SKIPPED] {type} for {media_title} skipped because file is not older than last updated metadata')
                     return 'skipped'
             else:
-                if type == 'NFO':
-                    file_status = write_nfo(config, file_path, library_type, media_root, media_title)
-                elif type == 'Episode NFO':
-                    file_status = write_episode_nfo(file_path, media_root, media_title)
-                elif type in ('Poster', 'Season Poster', 'Art'):
-                    if type == 'Poster':
-                        url = urljoin(baseurl, media_root.get('thumb'))
-                    elif type == 'Season Poster':
-                        url = urljoin(baseurl, season_dir.get('thumb'))
-                    else:
-                        url = urljoin(baseurl, media_root.get('art'))
-                    file_status = download_image(url, headers, season_path or file_path)
+                file_status = write_artifact(type, config, file_path, library_type, media_root, media_title, file_exists, season_dir, season_path, fan_out)
 
                 if file_status:
+                    remember_file(season_path or file_path)
                     logger.verbose(f'[ADDED] {type} for {media_title} successfully saved to {season_path or file_path}')
                     return 'success'
                 else:
@@ -749,7 +1562,7 @@ def resolve_base_settings(args, config):
     path_mapping = config.get('Path mapping', [])
     logger.debug(f'path_mapping: {path_mapping}')
 
-    return token, library_names, blacklists, path_mapping
+    return token, library_names, blacklists, compile_path_mapping(path_mapping)
 
 def build_export_flags(args, config):
     option_map = {
@@ -798,59 +1611,157 @@ def determine_dry_run(args):
     logger.debug('dry_run is set to False.')
     return False
 
+def resolve_int_option(name, arg_value, config, config_key, default):
+    if arg_value is not None:
+        value = arg_value
+        source = 'command-line argument'
+    else:
+        value = config.get(config_key) or default
+        source = 'config file'
+
+    try:
+        value = max(1, int(value))
+    except (TypeError, ValueError):
+        logger.warning(f'Invalid {name} value "{value}", falling back to {default}')
+        value = default
+
+    logger.debug(f'{name} is set to {value} by {source}.')
+    return value
+
+def determine_workers(args, config):
+    return resolve_int_option('workers', args.workers, config, 'Workers', 1)
+
 def create_library_result():
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
     return {
         'start': timestamp,
         'finish': '',
+        'items_unchanged': 0,
+        'metadata_failure': 0,
         'nfo_new': 0,
         'nfo_updated': 0,
         'nfo_skipped': 0,
+        'nfo_unchanged': 0,
         'nfo_failure': 0,
         'poster_new': 0,
         'poster_updated': 0,
         'poster_skipped': 0,
+        'poster_unchanged': 0,
         'poster_failure': 0,
         'art_new': 0,
         'art_updated': 0,
         'art_skipped': 0,
+        'art_unchanged': 0,
         'art_failure': 0,
         'season_poster_new': 0,
         'season_poster_updated': 0,
         'season_poster_skipped': 0,
+        'season_poster_unchanged': 0,
         'season_poster_failure': 0,
         'episode_nfo_new': 0,
         'episode_nfo_updated': 0,
         'episode_nfo_skipped': 0,
+        'episode_nfo_unchanged': 0,
         'episode_nfo_failure': 0,
     }
 
-def resolve_library_type(library_type, check_music):
+def resolve_library_passes(library_type):
+    """
+    Return the (processed type, root element, listing) passes that export a library,
+    music libraries are walked as their artists followed by their albums
+    """
     if library_type in TYPE_MAP:
         processed_type, root = TYPE_MAP[library_type]
-        return processed_type, root, check_music
+        return [(processed_type, root, 'all')]
 
-    if check_music == 0:
-        return 'artist', 'Directory', check_music + 1
+    if library_type == 'artist':
+        return MUSIC_PASSES
 
-    if check_music == 1:
-        return 'albums', 'Directory', check_music - 1
+    return [(library_type, 'Directory', 'all')]
 
-    return library_type, 'Directory', check_music
+def library_section_path(library, listing):
+    return f"/library/sections/{library.get('key')}/{listing}"
 
-def fetch_library_root(library, library_root, check_music_state):
-    suffix = 'all' if check_music_state == 0 else 'albums'
-    url = urljoin(baseurl, f"/library/sections/{library.get('key')}/{suffix}")
-    response = requests.get(url, headers=headers)
+def open_library_listing(library, library_root, listing, since=None):
+    """
+    Start streaming a library listing, returns the number of items plex reports and an iterator over their records
+    """
+    url = urljoin(baseurl, library_section_path(library, listing))
+    # requests encodes this as updatedAt>=since, letting plex return only items changed after the last sync
+    params = {'updatedAt>': since} if since else None
+    info = {}
+    records = iter_listing_records(url, library_root, params, info)
 
-    if response.status_code == 400:
-        response = fallback_response(url, headers['X-Plex-Token'])
+    # pull the first page so the total is known before any item is processed
+    first = next(records, None)
+    if first is None:
+        return 0, iter(())
 
-    if response.status_code != 200:
-        logger.error(f"Failed to get library info with error code {response.status_code}: {response.text}")
-        sys.exit()
+    return info.get('total'), itertools.chain([first], records)
 
-    return ET.fromstring(response.content)
+def album_folder_record(element):
+    part = element.find('Media/Part')
+    track_path = part.get('file') if part is not None else None
+    return element.get('parentRatingKey'), track_path
+
+def build_album_index(library):
+    """
+    Map every album of a music library to the folder of its first track from one paginated track listing,
+    instead of fetching each album's children to find out where it lives
+    """
+    url = urljoin(baseurl, f"/library/sections/{library.get('key')}/all")
+    album_folders = {}
+    for album_key, track_path in iter_listing_records(url, 'Track', {'type': 10}, record=album_folder_record):
+        if album_key and track_path and album_key not in album_folders:
+            album_folders[album_key] = track_path[:track_path.rfind('/')]+'/'
+    return album_folders
+
+def fetch_shows_with_changed_episodes(library, since):
+    """
+    Shows keep their own updatedAt when episodes are added or edited, so list changed episodes and return their shows
+    """
+    url = urljoin(baseurl, f"/library/sections/{library.get('key')}/all")
+    episodes = iter_listing_records(url, 'Video', {'type': 4, 'updatedAt>': since}, record=lambda element: element.get('grandparentRatingKey'))
+    return [{'ratingKey': show_key} for show_key in dict.fromkeys(episodes) if show_key]
+
+def fetch_show_children_updates(library, exports):
+    """
+    Map every show to the newest updatedAt among the episodes and seasons it exports, from one listing of each,
+    so a skipped show still notices an edited episode or a new season poster
+    """
+    url = urljoin(baseurl, f"/library/sections/{library.get('key')}/all")
+    listings = []
+    if exports['export_episode_nfo']:
+        listings.append(('Video', 4, 'grandparentRatingKey'))
+    if exports['export_season_poster']:
+        listings.append(('Directory', 3, 'parentRatingKey'))
+
+    children_updates = {}
+    for item_tag, item_type, show_attribute in listings:
+        records = iter_listing_records(url, item_tag, {'type': item_type}, record=lambda element: (element.get(show_attribute), int(element.get('updatedAt') or 0)))
+        for show_key, updated_at in records:
+            if show_key and updated_at > children_updates.get(show_key, -1):
+                children_updates[show_key] = updated_at
+    return {show_key: str(updated_at) for show_key, updated_at in children_updates.items()}
+
+def fetch_show_fingerprint(rating_key, exports):
+    """
+    The childrenUpdatedAt of one show as fetch_show_children_updates computes it for the whole library, from the
+    episode and season listings its export already requested
+    """
+    meta_url = urljoin(baseurl, f'/library/metadata/{rating_key}')
+    updates = []
+    if exports['export_episode_nfo']:
+        for page in iter_container_pages(f'{meta_url}/allLeaves', {'includeGuids': 1}):
+            updates.extend(int(element.get('updatedAt') or 0) for element in page.findall('Video'))
+    if exports['export_season_poster']:
+        response = plex_get(urljoin(f'{meta_url}/', 'children'), headers=headers)
+        response.raise_for_status()
+        updates.extend(int(element.get('updatedAt') or 0) for element in ET.fromstring(response.content).findall('Directory'))
+    return str(max(updates)) if updates else None
+
+def summary_has_failures(summary):
+    return any(value for key, value in summary.items() if key.endswith('_failure'))
 
 def update_summary(summary, category, status):
     if status == 'success':
@@ -859,56 +1770,62 @@ def update_summary(summary, category, status):
         key = f'{category}_updated'
     elif status == 'skipped':
         key = f'{category}_skipped'
-    elif status in ('not_exist', 'failure'):
+    elif status == 'unchanged':
+        key = f'{category}_unchanged'
+    elif status in FAILED_STATUSES:
         key = f'{category}_failure'
     else:
         return
 
-    summary[key] += 1
-
-def export_episode_nfos(meta_url, path_mapping, config, media_title, dry_run, force_overwrite, summary):
-    try:
-        meta_season_url = urljoin(meta_url + '/', 'children')
-        season_resp = requests.get(meta_season_url, headers=headers)
-
-        if season_resp.status_code != 200:
-            return
-
-        for season in ET.fromstring(season_resp.content).findall('Directory'):
-            season_key = season.get('ratingKey')
-            episodes_url = urljoin(meta_url[:meta_url.rfind('/')] + '/', f'{season_key}/children')
-            episodes_resp = requests.get(episodes_url, headers=headers)
+    with summary_lock:
+        summary[key] += 1
 
-            if episodes_resp.status_code != 200:
-                continue
+def fetch_episode_details(episode_key):
+    episode_url = urljoin(baseurl, f'/library/metadata/{episode_key}')
+    episode_data = plex_get(episode_url, headers=headers)
+    if episode_data.status_code != 200:
+        return None
 
-            for episode in ET.fromstring(episodes_resp.content).findall('Video'):
-                episode_key = episode.get('ratingKey')
-                episode_url = urljoin(meta_url[:meta_url.rfind('/')] + '/', episode_key)
-                episode_data = requests.get(episode_url, headers=headers)
-                episode_root = ET.fromstring(episode_data.content).find('Video')
+    return ET.fromstring(episode_data.content).find('Video')
 
-                if episode_root is None:
+def export_episode_nfos(meta_url, path_mapping, config, media_title, dry_run, force_overwrite, summary):
+    """
+    Write NFOs for every episode of a show from its allLeaves listing, only fetching an episode on its own when the listing lacks its file
+    """
+    ok = True
+    try:
+        leaves_url = f'{meta_url}/allLeaves'
+        for page in iter_container_pages(leaves_url, {'includeGuids': 1}):
+            for episode_root in page.findall('Video'):
+                if episode_root.find('Media/Part') is None:
+                    episode_root = fetch_episode_details(episode_root.get('ratingKey'))
+
+                if episode_root is None or episode_root.find('Media/Part') is None:
+                    logger.verbose(f'[FAILURE] Episode NFO for {media_title} skipped because the episode has no media file')
+                    ok = False
                     continue
 
                 episode_path = episode_root.find('Media/Part').get('file')
-                episode_nfo_path = episode_path[:episode_path.rfind('.')] + '.nfo'
-                for path_map in path_mapping:
-                    episode_nfo_path = episode_nfo_path.replace(path_map['plex'], path_map['local'])
+                episode_nfo_path = map_path(path_mapping, episode_path[:episode_path.rfind('.')] + '.nfo')
 
                 status = process_media('Episode NFO', config, episode_nfo_path, 'tvshow', episode_root, media_title, dry_run, force_overwrite)
                 update_summary(summary, 'episode_nfo', status)
+                ok = ok and status not in FAILED_STATUSES
     except Exception as exc:
         logger.verbose(f'[FAILURE] Episode NFO for {media_title} failed: {exc}')
-        summary['episode_nfo_failure'] += 1
+        update_summary(summary, 'episode_nfo', 'failure')
+        return False
+
+    return ok
 
-def export_season_posters(meta_url, media_path, fanart_path, config, meta_root, media_title, dry_run, force_overwrite, summary):
+def export_season_posters(meta_url, media_path, fanart_path, config, meta_root, media_title, dry_run, force_overwrite, summary, fan_out=None):
+    ok = True
     try:
         season_url = urljoin(f'{meta_url}/', 'children')
-        season_response = requests.get(season_url, headers=headers)
+        season_response = plex_get(season_url, headers=headers)
 
         if season_response.status_code != 200:
-            return
+            return False
 
         season_root = ET.fromstring(season_response.content).findall('Directory')
         for season_dir in season_root:
@@ -925,22 +1842,44 @@ def export_season_posters(meta_url, media_path, fanart_path, config, meta_root,
                 season_filename = f'season-{season_title}-cover.jpg'
 
             season_path = os.path.join(media_path, season_filename)
-            status = process_media('Season Poster', config, fanart_path, 'tvshow', meta_root, media_title, dry_run, force_overwrite, season_dir, season_path)
+            status = process_media('Season Poster', config, fanart_path, 'tvshow', meta_root, media_title, dry_run, force_overwrite, season_dir, season_path, fan_out)
             update_summary(summary, 'season_poster', status)
+            ok = ok and status not in FAILED_STATUSES
     except Exception as exc:
         logger.info(f'[FAILURE] Season poster for {media_title} failed: {exc}')
-        summary['season_poster_failure'] += 1
+        update_summary(summary, 'season_poster', 'failure')
+        return False
 
-def process_content(content, library_root, library_type, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, summary):
-    ratingkey = content.get('ratingKey')
-    meta_url = urljoin(baseurl, f"/library/metadata/{ratingkey}")
-    meta_response = requests.get(meta_url, headers=headers)
+    return ok
+
+def fetch_metadata_batch(rating_keys, library_root):
+    """
+    Fetch full metadata for several items in one request, keyed by ratingKey.
+    A failed request returns nothing and every item falls back to its own request, which counts it as failed if that fails too
+    """
+    meta_url = urljoin(baseurl, f"/library/metadata/{','.join(rating_keys)}")
+    meta_response = plex_get(meta_url, headers=headers)
     if meta_response.status_code != 200:
-        return
+        logger.warning(f'Batched metadata request for {len(rating_keys)} item(s) failed with HTTP {meta_response.status_code}, requesting them one by one')
+        return {}
+
+    return {element.get('ratingKey'): element for element in ET.fromstring(meta_response.content).findall(library_root)}
 
-    meta_root = ET.fromstring(meta_response.content).find(library_root)
+def process_content(content, library_root, library_type, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, summary, meta_root=None, album_folders=None):
+    """
+    Export every enabled artifact for one library item, returns True only if nothing failed, None if it was filtered out by --title.
+    Metadata that can't be fetched counts as metadata_failure, so an incremental sync point stays before the item
+    """
+    ratingkey = content.get('ratingKey')
+    meta_url = urljoin(baseurl, f"/library/metadata/{ratingkey}")
     if meta_root is None:
-        return
+        meta_response = plex_get(meta_url, headers=headers)
+        meta_root = ET.fromstring(meta_response.content).find(library_root) if meta_response.status_code == 200 else None
+        if meta_root is None:
+            logger.verbose(f"[FAILURE] Metadata for {content.get('title') or ratingkey} could not be fetched, HTTP {meta_response.status_code}")
+            with summary_lock:
+                summary['metadata_failure'] += 1
+            return False
 
     media_title = meta_root.get('title')
 
@@ -948,78 +1887,664 @@ def process_content(content, library_root, library_type, args, config, path_mapp
         return
 
     file_title = meta_root.find('Media/Part').get('file') if library_type == 'movie' else None
-    media_paths = get_media_path(library_type, meta_root, meta_url, path_mapping, headers)
+    media_paths = get_media_path(library_type, meta_root, meta_url, path_mapping, headers, album_folders)
 
+    ok = True
+    # episode files live at their own paths, whichever Location of the show they are in
+    if exports['export_episode_nfo'] and library_type == 'tvshow':
+        ok = export_episode_nfos(meta_url, path_mapping, config, media_title, dry_run, force_overwrite, summary)
+
+    # the NFO is rendered and each image downloaded once, every other media path gets a copy
+    fan_out = {}
     for media_path in media_paths:
         logger.debug(f'media_path: {media_path}')
         nfo_path, poster_path, fanart_path = get_file_path(library_type, movie_filename_type, image_filename_type, media_path, media_title, file_title)
 
         if exports['export_nfo']:
-            status = process_media('NFO', config, nfo_path, library_type, meta_root, media_title, dry_run, force_overwrite)
+            status = process_media('NFO', config, nfo_path, library_type, meta_root, media_title, dry_run, force_overwrite, fan_out=fan_out)
             update_summary(summary, 'nfo', status)
-
-        if exports['export_episode_nfo'] and library_type == 'tvshow':
-            export_episode_nfos(meta_url, path_mapping, config, media_title, dry_run, force_overwrite, summary)
+            ok = ok and status not in FAILED_STATUSES
 
         if exports['export_poster']:
-            status = process_media('Poster', config, poster_path, library_type, meta_root, media_title, dry_run, force_overwrite)
+            status = process_media('Poster', config, poster_path, library_type, meta_root, media_title, dry_run, force_overwrite, fan_out=fan_out)
             update_summary(summary, 'poster', status)
+            ok = ok and status not in FAILED_STATUSES
 
         if exports['export_fanart']:
-            status = process_media('Art', config, fanart_path, library_type, meta_root, media_title, dry_run, force_overwrite)
+            status = process_media('Art', config, fanart_path, library_type, meta_root, media_title, dry_run, force_overwrite, fan_out=fan_out)
             update_summary(summary, 'art', status)
+            ok = ok and status not in FAILED_STATUSES
 
         if exports['export_season_poster'] and library_type == 'tvshow':
-            export_season_posters(meta_url, media_path, fanart_path, config, meta_root, media_title, dry_run, force_overwrite, summary)
+            ok = export_season_posters(meta_url, media_path, fanart_path, config, meta_root, media_title, dry_run, force_overwrite, summary, fan_out) and ok
+
+    return ok
+
+def run_tasks(items, task, concurrency, bar):
+    """
+    Run task for every item on the worker pool, task returns how many entries it advanced the progress bar by
+    """
+    if concurrency > 1:
+        # progress is only advanced from this thread, summary counters are guarded by summary_lock
+        # submissions are capped so a streaming listing is not read far ahead of the workers
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for item in items:
+                if len(pending) >= concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        bar(future.result())
+                pending.add(executor.submit(task, item))
+
+            for future in as_completed(pending):
+                bar(future.result())
+    else:
+        for item in items:
+            bar(task(item))
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
 
-def process_library(library, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, check_music, library_result):
+def with_extra_items(items, extras, duplicates):
+    """
+    Yield items followed by the extras that were not already listed, counting the dropped ones in duplicates['count']
+    """
+    seen = set()
+    for item in items:
+        seen.add(item.get('ratingKey'))
+        yield item
+
+    for extra in extras:
+        if extra.get('ratingKey') in seen:
+            duplicates['count'] += 1
+        else:
+            yield extra
+
+def prepare_library(library, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, library_result):
+    """
+    Open a library's listings and build the task exporting them, returns a job with the batches still to run in job['work']
+    """
     library_name = library.get('name')
+    library_key = library.get('key')
     summary = create_library_result()
     library_result[library_name] = summary
 
-    lib_type = library.get('type')
-    library_type, library_root, updated_check_music = resolve_library_type(lib_type, check_music)
+    passes = []
+    total = 0
+    duplicates = {'count': 0}
+    sync_start = int(time.time())
+    for library_type, library_root, listing in resolve_library_passes(library.get('type')):
+        sync_key = library_section_path(library, listing)
+        since = get_last_sync(sync_key) if incremental else None
+        if since:
+            since -= SYNC_OVERLAP_SECONDS
+            logger.verbose(f'[INCREMENTAL] Listing {library_name} {listing} items updated since {datetime.fromtimestamp(since).isoformat()}')
+
+        pass_total, library_contents = open_library_listing(library, library_root, listing, since)
+        pass_total = pass_total or 0
+
+        if since and library_type == 'tvshow' and (exports['export_episode_nfo'] or exports['export_season_poster']):
+            changed_shows = fetch_shows_with_changed_episodes(library, since)
+            pass_total += len(changed_shows)
+            library_contents = with_extra_items(library_contents, changed_shows, duplicates)
+
+        # an incremental run touches few albums, where asking each one for its tracks is cheaper than listing every track
+        album_folders = build_album_index(library) if library_type == 'albums' and pass_total and not since else None
+
+        total += pass_total
+        passes.append((library_type, library_root, sync_key, library_contents, album_folders))
+
+    manifest = load_manifest(library_key) if skip_unchanged else {}
+    # an incremental run already lists the shows of changed episodes, their rows are left without a fingerprint
+    children_updates = {}
+    if skip_unchanged and not incremental and library.get('type') == 'show' and (exports['export_episode_nfo'] or exports['export_season_poster']):
+        children_updates = fetch_show_children_updates(library, exports)
+
+    def task(work):
+        library_type, library_root, album_folders, batch = work
+        if children_updates:
+            batch = [dict(content, childrenUpdatedAt=children_updates.get(content.get('ratingKey'))) for content in batch]
+        pending = [content for content in batch if not is_unchanged(manifest, content, signature)]
+        if len(pending) < len(batch):
+            with summary_lock:
+                summary['items_unchanged'] += len(batch) - len(pending)
+
+        metadata = fetch_metadata_batch([content.get('ratingKey') for content in pending], library_root) if pending else {}
+        for content in pending:
+            # items missing from the batched response fall back to their own request
+            meta_root = metadata.get(content.get('ratingKey'))
+            ok = process_content(content, library_root, library_type, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, summary, meta_root, album_folders)
+            # shows added for their changed episodes carry only a ratingKey, their manifest row is built from the fetched metadata
+            if 'updatedAt' not in content and meta_root is not None:
+                content = {**meta_root.attrib, **content}
+            if ok and not dry_run and not args.title and 'updatedAt' in content:
+                record_item(library_key, content, signature)
+
+        commit_state_db()
+        return len(batch)
+
+    # keep batches small enough that every worker gets a share of short libraries
+    batch_size = max(1, min(batch_size, -(-total // concurrency)))
+
+    def iter_work():
+        for library_type, library_root, sync_key, library_contents, album_folders in passes:
+            for batch in iter_batches(library_contents, batch_size):
+                yield library_type, library_root, album_folders, batch
+
+    return {
+        'name': library_name,
+        'summary': summary,
+        'total': total,
+        'done': 0,
+        'duplicates': duplicates,
+        'sync_keys': [sync_key for _, _, sync_key, _, _ in passes],
+        'sync_start': sync_start,
+        'task': task,
+        'work': iter_work(),
+    }
+
+def finish_library(job, args, dry_run):
+    summary = job['summary']
+    summary['finish'] = summary['finish'] or datetime.now().strftime('%Y-%m-%d %H:%M')
+
+    # only move the sync point forward once everything listed was exported, failed items are retried next run
+    if not dry_run and not args.title:
+        if summary_has_failures(summary):
+            logger.verbose(f"[INCREMENTAL] {job['name']} had failures, next run lists it from the previous sync point")
+        else:
+            for sync_key in job['sync_keys']:
+                record_sync(sync_key, job['sync_start'])
 
-    full_root = fetch_library_root(library, library_root, updated_check_music)
-    library_contents = full_root.findall(library_root)
+def process_library(library, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, library_result):
+    job = prepare_library(library, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, library_result)
 
-    with alive_bar(len(library_contents), monitor=True, elapsed=True, stats=False, receipt_text=True) as bar:
-        bar.text(f'for {library_name}')
-        for content in library_contents:
-            process_content(content, library_root, library_type, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, summary)
-            bar()
+    with alive_bar(job['total'], monitor=True, elapsed=True, stats=False, receipt_text=True) as bar:
+        bar.text(f"for {job['name']}")
+        run_tasks(job['work'], job['task'], concurrency, bar)
+        if job['duplicates']['count']:
+            bar(job['duplicates']['count'])
 
-    summary['finish'] = datetime.now().strftime('%Y-%m-%d %H:%M')
-    return updated_check_music
+    finish_library(job, args, dry_run)
+
+def interleave_library_work(libraries, prepare, limit, jobs):
+    """
+    Yield (job, work) taking turns between at most limit libraries at a time, so a long library shares the workers with
+    the others instead of holding them up. A library is only prepared (listed) once it gets a turn, each prepared job is
+    appended to jobs.
+    """
+    waiting = iter(libraries)
+    active = deque()
+
+    def start(count):
+        for library in itertools.islice(waiting, count):
+            job = prepare(library)
+            jobs.append(job)
+            active.append(job)
+
+    start(limit)
+    while active:
+        job = active.popleft()
+        work = next(job['work'], None)
+        if work is None:
+            start(1)
+            continue
+
+        yield job, work
+        active.append(job)
+
+def process_libraries_parallel(libraries, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, parallel_libraries, library_result):
+    """
+    Export several libraries at once, all of them sharing the one worker pool (Workers) as their budget.
+    Libraries are listed as they start, so the size of the whole run is unknown up front: alive_progress draws a single
+    counting bar and its text keeps the per-library progress.
+    """
+    jobs = []
+
+    def prepare(library):
+        return prepare_library(library, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, library_result)
+
+    def task(item):
+        job, work = item
+        return job, job['task'](work)
+
+    with alive_bar(monitor=True, elapsed=True, stats=False, receipt_text=True) as bar:
+        def show_progress():
+            started = [job['name'] for job in jobs]
+            progress = [f"{job['name']} {job['done']}/{job['total']}" for job in jobs]
+            progress += [f"{library.get('name')} queued" for library in libraries if library.get('name') not in started]
+            bar.text(' | '.join(progress))
+
+        def advance(result):
+            job, count = result
+            job['done'] += count
+            job['summary']['finish'] = datetime.now().strftime('%Y-%m-%d %H:%M')
+            bar(count)
+            show_progress()
+
+        show_progress()
+        run_tasks(interleave_library_work(libraries, prepare, parallel_libraries, jobs), task, concurrency, advance)
+        for job in jobs:
+            if job['duplicates']['count']:
+                advance((job, job['duplicates']['count']))
+
+    for job in jobs:
+        finish_library(job, args, dry_run)
+
+def export_all_libraries(library_details, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, parallel_libraries):
+    """
+    Run a full pass over every selected library, returns the per-library summaries
+    """
+    reset_directory_cache()
+    reset_response_cache()
+    library_result = {}
+
+    if parallel_libraries > 1 and len(library_details) > 1:
+        process_libraries_parallel(
+            library_details,
+            args,
+            config,
+            path_mapping,
+            exports,
+            movie_filename_type,
+            image_filename_type,
+            dry_run,
+            force_overwrite,
+            concurrency,
+            batch_size,
+            signature,
+            skip_unchanged,
+            incremental,
+            parallel_libraries,
+            library_result,
+        )
+    else:
+        for library in library_details:
+            process_library(
+                library,
+                args,
+                config,
+                path_mapping,
+                exports,
+                movie_filename_type,
+                image_filename_type,
+                dry_run,
+                force_overwrite,
+                concurrency,
+                batch_size,
+                signature,
+                skip_unchanged,
+                incremental,
+                library_result,
+            )
+
+    return library_result
+
+# plex item type -> (processed type, root element) of what gets exported, child items export their show or album
+EXPORT_TARGETS = {
+    'movie': ('movie', 'Video'),
+    'show': ('tvshow', 'Directory'),
+    'artist': ('artist', 'Directory'),
+    'album': ('albums', 'Directory'),
+}
+PARENT_TARGETS = {
+    'season': ('parentRatingKey', 'show'),
+    'episode': ('grandparentRatingKey', 'show'),
+    'track': ('parentRatingKey', 'album'),
+}
+
+def resolve_export_target(rating_key, libraries_by_section):
+    """
+    Find what to export for a changed ratingKey, returns (library, processed type, root element, ratingKey) or None
+    when the item is gone or belongs to a library that isn't selected
+    """
+    response = plex_get(urljoin(baseurl, f'/library/metadata/{rating_key}'), headers=headers)
+    if response.status_code == 404:
+        logger.debug(f'[WATCH] {rating_key} is gone from plex, nothing to export')
+        return None
+    # any other failure (i.e. plex restarting) raises, so the daemon keeps the batch and retries it
+    response.raise_for_status()
+
+    container = ET.fromstring(response.content)
+    element = next(iter(container), None)
+    if element is None:
+        return None
+
+    library = libraries_by_section.get(element.get('librarySectionID') or container.get('librarySectionID'))
+    if library is None:
+        return None
+
+    item_type = element.get('type')
+    if item_type in PARENT_TARGETS:
+        parent_attribute, item_type = PARENT_TARGETS[item_type]
+        rating_key = element.get(parent_attribute)
+    if item_type not in EXPORT_TARGETS or not rating_key:
+        return None
+
+    library_type, library_root = EXPORT_TARGETS[item_type]
+    return library, library_type, library_root, str(rating_key)
+
+def export_rating_keys(rating_keys, library_details, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, parallel_libraries):
+    """
+    Export only the items behind the given ratingKeys, several episodes of one show export that show once.
+    Returns the per-library summaries.
+    """
+    reset_directory_cache()
+    reset_response_cache()
+    libraries_by_section = {library.get('key'): library for library in library_details}
+
+    targets = {}
+    for rating_key in rating_keys:
+        target = resolve_export_target(rating_key, libraries_by_section)
+        if target is not None:
+            targets[target[3]] = target
+
+    library_result = {}
+    for library, _, _, _ in targets.values():
+        library_result.setdefault(library.get('name'), create_library_result())
+
+    def task(target):
+        library, library_type, library_root, rating_key = target
+        summary = library_result[library.get('name')]
+        meta_root = fetch_metadata_batch([rating_key], library_root).get(rating_key)
+        # without metadata process_content requests it once more and counts metadata_failure if that fails too
+        ok = process_content({'ratingKey': rating_key}, library_root, library_type, args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, summary, meta_root)
+        if meta_root is None:
+            if ok is False:
+                logger.warning(f'[WATCH] Metadata for {rating_key} could not be fetched, the next full pass exports it')
+            return 1
+
+        # the manifest row lets the next full pass skip what was just exported, shows carry the fingerprint that pass compares
+        if ok and not dry_run and not args.title:
+            content = dict(meta_root.attrib)
+            if skip_unchanged and not incremental and library.get('type') == 'show' and (exports['export_episode_nfo'] or exports['export_season_poster']):
+                content['childrenUpdatedAt'] = fetch_show_fingerprint(rating_key, exports)
+            record_item(library.get('key'), content, signature)
+        return 1
+
+    run_tasks(list(targets.values()), task, concurrency, lambda count: None)
+    commit_state_db()
+
+    finish = datetime.now().strftime('%Y-%m-%d %H:%M')
+    for summary in library_result.values():
+        summary['finish'] = finish
+    return library_result
+
+LIBRARY_TIMELINE_IDENTIFIER = 'com.plexapp.plugins.library'
+# timeline item types: movie, show, season, episode, artist, album, track
+WATCHED_TIMELINE_TYPES = (1, 2, 3, 4, 8, 9, 10)
+# timeline state plex sends once an item is added and its metadata is processed
+TIMELINE_STATE_DONE = 5
+WATCHED_ACTIVITIES = ('library.update.item.metadata', 'library.refresh.items')
+
+def parse_notification(message):
+    """
+    Return the ratingKeys a plex websocket notification reports as added or changed:
+    finished library timeline entries, and ended metadata refresh/edit activities
+    """
+    try:
+        container = json.loads(message).get('NotificationContainer') or {}
+    except (ValueError, AttributeError):
+        return []
+
+    rating_keys = []
+    if container.get('type') == 'timeline':
+        for entry in container.get('TimelineEntry') or []:
+            if entry.get('identifier') == LIBRARY_TIMELINE_IDENTIFIER and entry.get('state') == TIMELINE_STATE_DONE and entry.get('type') in WATCHED_TIMELINE_TYPES and entry.get('itemID'):
+                rating_keys.append(str(entry.get('itemID')))
+    elif container.get('type') == 'activity':
+        for notification in container.get('ActivityNotification') or []:
+            activity = notification.get('Activity') or {}
+            key = (activity.get('Context') or {}).get('key') or ''
+            if notification.get('event') == 'ended' and activity.get('type') in WATCHED_ACTIVITIES and key.startswith('/library/metadata/'):
+                rating_keys.append(key.rsplit('/', 1)[-1])
+
+    return rating_keys
+
+def notification_url(token):
+    url = urljoin(baseurl, '/:/websockets/notifications')
+    return re.sub(r'^http', 'ws', url) + '?' + urlencode({'X-Plex-Token': token})
+
+def listen_for_notifications(token, on_keys, stop):
+    """
+    Keep a websocket to plex open until stop is set, reconnecting with a growing delay whenever it drops
+    """
+    try:
+        import websocket
+    except ImportError:
+        logger.error('Watch mode needs the websocket-client package, install it with pip install websocket-client')
+        stop.set()
+        return
+
+    delay = 1
+    while not stop.is_set():
+        def on_open(ws):
+            nonlocal delay
+            delay = 1
+            logger.info('[WATCH] Listening for plex notifications')
+
+        def on_message(ws, message):
+            rating_keys = parse_notification(message)
+            if rating_keys:
+                on_keys(rating_keys)
+
+        def on_error(ws, error):
+            logger.verbose(f'[WATCH] Notification connection error: {error}')
+
+        # the thread is a daemon, a connection still open when watch mode stops ends with the process
+        app = websocket.WebSocketApp(notification_url(token), on_open=on_open, on_message=on_message, on_error=on_error)
+        app.run_forever(ping_interval=30, ping_timeout=10)
+
+        if not stop.is_set():
+            logger.warning(f'[WATCH] Lost the plex notification connection, reconnecting in {delay}s')
+            stop.wait(delay)
+            delay = min(delay * 2, 60)
+
+# webhook events that mean an item's exported metadata may have changed, media.rate carries the new user rating
+WEBHOOK_EVENTS = ('library.new', 'media.rate')
+# plex posts a few KB of JSON plus at most a thumbnail, anything larger is refused unread
+WEBHOOK_MAX_BODY = 2 * 1024 * 1024
+
+def parse_webhook(content_type, body):
+    """
+    Return the ratingKeys a webhook reports, plex posts a multipart form whose payload field holds the event as JSON,
+    a plain JSON body with the same shape is accepted too
+    """
+    payload = body
+    if content_type.startswith('multipart/'):
+        message = email.message_from_bytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+        payload = None
+        for part in message.get_payload() if message.is_multipart() else []:
+            if part.get_param('name', header='content-disposition') == 'payload':
+                payload = part.get_payload(decode=True)
+        if payload is None:
+            raise ValueError('multipart webhook without a payload field')
+
+    event = json.loads(payload)
+    if event.get('event') not in WEBHOOK_EVENTS:
+        return []
+
+    rating_key = (event.get('Metadata') or {}).get('ratingKey')
+    return [str(rating_key)] if rating_key else []
+
+def start_webhook_server(host, port, on_keys):
+    """
+    Serve the webhook endpoint on a background thread, any POST path is accepted so plex can be pointed at the bare address
+    """
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0 or length > WEBHOOK_MAX_BODY:
+                logger.verbose(f"[SERVE] Refusing webhook body of {self.headers.get('Content-Length')} bytes")
+                self.send_response(413 if length > 0 else 400)
+                self.end_headers()
+                return
+
+            body = self.rfile.read(length)
+            try:
+                rating_keys = parse_webhook(self.headers.get('Content-Type') or '', body)
+            except (ValueError, AttributeError) as exc:
+                logger.verbose(f'[SERVE] Ignoring malformed webhook: {exc}')
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            if rating_keys:
+                on_keys(rating_keys)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(f'[SERVE] {self.address_string()} {format % args}')
+
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f'[SERVE] Listening for plex webhooks on {host}:{port}')
+    return server
+
+def run_daemon(token, library_details, run_settings, config, log_name, watch, serve):
+    """
+    Stay running and export items as plex reports them added or changed, over its notification websocket (watch)
+    and/or webhooks posted to this process (serve).
+    Changed items are collected until Watch debounce seconds pass without a new one (at most Watch max delay), so repeated
+    events for one item export it once, a full pass runs at start and then every Watch full pass interval hours as a safety net.
+    """
+    global daemon_mode
+    daemon_mode = True
+    exports, dry_run = run_settings[3], run_settings[6]
+    debounce = float(config.get('Watch debounce') or 10)
+    max_delay = max(debounce, float(config.get('Watch max delay') or 120))
+    full_pass_hours = config.get('Watch full pass interval')
+    full_pass_interval = float(24 if full_pass_hours is None else full_pass_hours) * 3600
+
+    pending = {}
+    pending_lock = threading.Lock()
+    last_event = [0.0]
+
+    def queue_keys(rating_keys):
+        now = time.monotonic()
+        with pending_lock:
+            for rating_key in rating_keys:
+                pending.setdefault(rating_key, now)
+            last_event[0] = now
+        logger.debug(f'[WATCH] Queued {rating_keys}')
+
+    stop = threading.Event()
+    if watch:
+        listener = threading.Thread(target=listen_for_notifications, args=(token, queue_keys, stop), daemon=True)
+        listener.start()
+
+    server = None
+    if serve:
+        host = str(config.get('Webhook host') or '0.0.0.0')
+        port = int(config.get('Webhook port') or 32600)
+        server = start_webhook_server(host, port, queue_keys)
+
+    next_full_pass = time.monotonic()
+    retry_delay = debounce
+    retry_at = 0.0
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if now < retry_at:
+                stop.wait(1)
+                continue
+
+            # plex restarting (i.e. nightly maintenance) fails a pass, the work is kept and retried with a growing delay
+            if now >= next_full_pass:
+                logger.info('[WATCH] Running full pass')
+                try:
+                    library_result = export_all_libraries(library_details, *run_settings)
+                except Exception as exc:
+                    logger.error(f'[WATCH] Full pass failed, retrying in {retry_delay:.0f}s: {exc}')
+                    retry_at = time.monotonic() + retry_delay
+                    retry_delay = min(retry_delay * 2, max_delay)
+                    continue
+
+                print_run_summary(library_result, exports, dry_run, log_name)
+                next_full_pass = time.monotonic() + full_pass_interval if full_pass_interval else float('inf')
+                retry_delay = debounce
+                continue
+
+            with pending_lock:
+                ready = pending and (now - last_event[0] >= debounce or now - min(pending.values()) >= max_delay)
+                batch = dict(pending) if ready else {}
+                if ready:
+                    pending.clear()
+
+            if batch:
+                logger.info(f'[WATCH] Exporting {len(batch)} changed item(s)')
+                try:
+                    library_result = export_rating_keys(list(batch), library_details, *run_settings)
+                except Exception as exc:
+                    logger.error(f'[WATCH] Export of {len(batch)} item(s) failed, retrying in {retry_delay:.0f}s: {exc}')
+                    with pending_lock:
+                        for rating_key, queued_at in batch.items():
+                            pending[rating_key] = min(queued_at, pending.get(rating_key, queued_at))
+                    retry_at = time.monotonic() + retry_delay
+                    retry_delay = min(retry_delay * 2, max_delay)
+                    continue
+
+                retry_delay = debounce
+                for library_name, summary in library_result.items():
+                    logger.info(f"[WATCH] {library_name}: {summary_counts(summary)}")
+
+            stop.wait(1)
+    except KeyboardInterrupt:
+        logger.info('[WATCH] Stopping')
+    finally:
+        stop.set()
+        if server is not None:
+            server.shutdown()
+
+def summary_counts(summary):
+    """
+    One line of the non-zero export counters of a library summary, i.e. "nfo_new=1, poster_updated=2"
+    """
+    return ', '.join(f'{key}={value}' for key, value in summary.items() if isinstance(value, int) and value) or 'nothing to do'
 
 def print_library_summary(library_result, exports):
     for library_name, summary in library_result.items():
         print(f"\n============================ {library_name.upper()} PROCESSING SUMMARY ============================")
         print(f"\nStart       : {summary['start']}\nFinished    : {summary['finish']}")
+        if summary['items_unchanged']:
+            print(f"Unchanged   : {summary['items_unchanged']} item(s) skipped, not modified since last export")
+        if summary['metadata_failure']:
+            print(f"Failed      : {summary['metadata_failure']} item(s) skipped, their metadata could not be fetched from plex")
 
         if exports['export_nfo']:
             print(
-                f"\nNFO Files\n  - Added     : {summary['nfo_new']} NFO(s)\n  - Updated   : {summary['nfo_updated']} NFO(s)\n  - Skipped   : {summary['nfo_skipped']} NFO(s)\n  - Failed    : {summary['nfo_failure']} NFO(s)"
+                f"\nNFO Files\n  - Added     : {summary['nfo_new']} NFO(s)\n  - Updated   : {summary['nfo_updated']} NFO(s)\n  - Skipped   : {summary['nfo_skipped']} NFO(s)\n  - Unchanged : {summary['nfo_unchanged']} NFO(s)\n  - Failed    : {summary['nfo_failure']} NFO(s)"
             )
 
         if exports['export_poster']:
             print(
-                f"\nPoster Images\n  - Added     : {summary['poster_new']} poster(s)\n  - Updated   : {summary['poster_updated']} poster(s)\n  - Skipped   : {summary['poster_skipped']} poster(s)\n  - Failed    : {summary['poster_failure']} poster(s)"
+                f"\nPoster Images\n  - Added     : {summary['poster_new']} poster(s)\n  - Updated   : {summary['poster_updated']} poster(s)\n  - Skipped   : {summary['poster_skipped']} poster(s)\n  - Unchanged : {summary['poster_unchanged']} poster(s)\n  - Failed    : {summary['poster_failure']} poster(s)"
             )
 
         if exports['export_fanart']:
             print(
-                f"\nArt Images\n  - Added     : {summary['art_new']} art(s)\n  - Updated   : {summary['art_updated']} art(s)\n  - Skipped   : {summary['art_skipped']} art(s)\n  - Failed    : {summary['art_failure']} art(s)"
+                f"\nArt Images\n  - Added     : {summary['art_new']} art(s)\n  - Updated   : {summary['art_updated']} art(s)\n  - Skipped   : {summary['art_skipped']} art(s)\n  - Unchanged : {summary['art_unchanged']} art(s)\n  - Failed    : {summary['art_failure']} art(s)"
             )
 
         if exports['export_season_poster']:
             print(
-                f"\nSeason Poster Images\n  - Added     : {summary['season_poster_new']} season poster(s)\n  - Updated   : {summary['season_poster_updated']} season poster(s)\n  - Skipped   : {summary['season_poster_skipped']} season poster(s)\n  - Failed    : {summary['season_poster_failure']} season poster(s)"
+                f"\nSeason Poster Images\n  - Added     : {summary['season_poster_new']} season poster(s)\n  - Updated   : {summary['season_poster_updated']} season poster(s)\n  - Skipped   : {summary['season_poster_skipped']} season poster(s)\n  - Unchanged : {summary['season_poster_unchanged']} season poster(s)\n  - Failed    : {summary['season_poster_failure']} season poster(s)"
             )
 
         if exports['export_episode_nfo']:
             print(
-                f"\nEpisode NFO Files\n  - Added     : {summary['episode_nfo_new']} episode NFO(s)\n  - Updated   : {summary['episode_nfo_updated']} episode NFO(s)\n  - Skipped   : {summary['episode_nfo_skipped']} episode NFO(s)\n  - Failed    : {summary['episode_nfo_failure']} episode NFO(s)"
+                f"\nEpisode NFO Files\n  - Added     : {summary['episode_nfo_new']} episode NFO(s)\n  - Updated   : {summary['episode_nfo_updated']} episode NFO(s)\n  - Skipped   : {summary['episode_nfo_skipped']} episode NFO(s)\n  - Unchanged : {summary['episode_nfo_unchanged']} episode NFO(s)\n  - Failed    : {summary['episode_nfo_failure']} episode NFO(s)"
             )
 
 def main(args, log_name):
@@ -1027,40 +2552,61 @@ def main(args, log_name):
 
     token, library_names, blacklists, path_mapping = resolve_base_settings(args, config)
 
+    concurrency = determine_workers(args, config)
+    configure_session(config, concurrency)
+    batch_size = resolve_int_option('metadata_batch_size', None, config, 'Metadata batch size', 100)
+
     global headers
     headers = {'X-Plex-Token': token}
     library_details = get_library_details(baseurl, headers, library_names, blacklists)
 
     exports = build_export_flags(args, config)
+
+    global render_plan
+    render_plan = build_render_plan(config)
     movie_filename_type = (args.nfo_name_type or config.get('Movie NFO name type') or 'default').lower()
     image_filename_type = (args.image_name_type or config.get('Movie Poster/art name type') or 'default').lower()
 
     force_overwrite = determine_force_overwrite(args, config)
     dry_run = determine_dry_run(args)
 
-    library_result = {}
-    check_music = 0
+    configure_images(config, concurrency)
+    open_state_db(resolve_state_db_path())
+    signature = build_export_signature(config, exports, movie_filename_type, image_filename_type)
+    skip_unchanged = bool(config.get('Skip unchanged items', True)) and not force_overwrite and not args.full
+    logger.debug(f'skip_unchanged is set to {skip_unchanged}.')
+    incremental = bool(config.get('Incremental sync', False)) and not args.full and not force_overwrite
+    logger.debug(f'incremental is set to {incremental}.')
+
+    parallel_libraries = resolve_int_option('parallel_libraries', args.parallel_libraries, config, 'Parallel libraries', 1)
 
     print('')
 
-    for library in library_details:
-        check_music = process_library(
-            library,
-            args,
-            config,
-            path_mapping,
-            exports,
-            movie_filename_type,
-            image_filename_type,
-            dry_run,
-            force_overwrite,
-            check_music,
-            library_result,
-        )
+    run_settings = (args, config, path_mapping, exports, movie_filename_type, image_filename_type, dry_run, force_overwrite, concurrency, batch_size, signature, skip_unchanged, incremental, parallel_libraries)
+    if args.watch or args.serve:
+        try:
+            run_daemon(token, library_details, run_settings, config, log_name, args.watch, args.serve)
+        finally:
+            close_state_db()
+            shutdown_image_pool()
+        return
+
+    library_result = export_all_libraries(library_details, *run_settings)
 
+    close_state_db()
+    shutdown_image_pool()
+
+    print_run_summary(library_result, exports, dry_run, log_name)
+
+def print_run_summary(library_result, exports, dry_run, log_name):
     if not dry_run:
         print_library_summary(library_result, exports)
 
+    if response_cache_limit:
+        print(f"\nResponse cache: {response_cache_stats['hits']} hit(s), {response_cache_stats['misses']} miss(es)")
+    if limiter['enabled'] and limiter['backoffs']:
+        print(f"Rate limiter  : backed off {limiter['backoffs']} time(s) because plex slowed down, ended at {limiter['limit']} request(s) in flight")
+
     print(f'\nLog file: {log_name}.log')
     print('Check the log file for entries marked [ADDED], [UPDATED], [SKIPPED], and [FAILED].')
     print('To display those in the terminal instead, set "LOG_LEVEL" to "VERBOSE" in your config.yml or as an environment variable.\n')
@@ -1092,8 +2638,15 @@ if __name__ == '__main__':
 
     parser.add_argument("--force-overwrite", "-f", dest="force_overwrite", action=StoreTrueIfFlagPresent, nargs=0, help="Overwrite files without checking server metadata; overrides config.yml setting", default=None)
 
+    parser.add_argument("--full", action="store_true", help="List and check every library item, ignoring Incremental sync and Skip unchanged items")
+    parser.add_argument("--watch", action="store_true", help="Keep running and export items as plex reports them added or changed")
+    parser.add_argument("--serve", action="store_true", help="Keep running and export items named by plex webhooks posted to Webhook host/port")
+
     parser.add_argument("--dry-run", action="store_true", help="Simulate actions without making any changes")
 
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Number of items exported in parallel; overrides config.yml setting")
+    parser.add_argument("--parallel-libraries", type=int, default=None, help="Number of libraries exported at the same time; overrides config.yml setting")
+
     parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "CRITICAL", "VERBOSE"], type=str.upper, default=None)
 
     args = parser.parse_args()